@@ -1,17 +1,4 @@
-import sqlite3
-import functools
-
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-            print("Database connection closed.")
-    return wrapper
+from db_connection import with_db_connection
 
 @with_db_connection 
 def get_user_by_id(conn, user_id): 
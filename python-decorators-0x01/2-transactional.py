@@ -1,31 +1,24 @@
-import sqlite3 
 import functools
 
-"""your code goes here"""
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-            print("Database connection closed.")
-    return wrapper
+from caching import invalidate_writes, track_writes
+from db_connection import with_db_connection
 
+"""your code goes here"""
 def transactional(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)
-            conn.commit()
-            print("Transaction committed.")
-            return result
-        except Exception as e:
-            conn.rollback()
-            print("Transaction rolled back due to an error:", e)
-            raise
+        with track_writes(conn) as written:
+            try:
+                result = func(conn, *args, **kwargs)
+                conn.commit()
+                print("Transaction committed.")
+            except Exception as e:
+                conn.rollback()
+                print("Transaction rolled back due to an error:", e)
+                raise
+        # Only committed writes make cached reads stale
+        invalidate_writes(conn, written)
+        return result
     return wrapper
 
 @with_db_connection 
@@ -1,22 +1,9 @@
 import time
-import sqlite3 
 import functools
 
-#### paste your with_db_decorator here
+from db_connection import with_db_connection
 
 """ your code goes here"""
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-            print("Database connection closed.")
-    return wrapper
-
 def retry_on_failure(retries=3, delay=2):
     def decorator(func):
         @functools.wraps(func)
@@ -1,34 +1,53 @@
 import time
-import sqlite3 
 import functools
 
-
-query_cache = {}
+from caching import async_cache_key, cache_key, get_query_cache, is_read_only, read_tables
+from db_connection import with_db_connection
 
 """your code goes here"""
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-            print("Database connection closed.")
-    return wrapper
+def _query_args(args, kwargs):
+    query = kwargs.get('query') if 'query' in kwargs else (args[0] if args else None)
+    params = kwargs.get('params') if 'params' in kwargs else (args[1] if len(args) > 1 else None)
+    return query, params
 
+# Concurrent misses on one query are coalesced: only the first caller runs
+# it, the others wait for its result instead of hitting the database too.
 def cache_query(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
-        query = kwargs.get('query') if 'query' in kwargs else (args[0] if args else None)
-        if query in query_cache:
-            print("[Returning cached result.")
-            return query_cache[query]
-        
-        print("Executing and caching result.")
-        result = func(conn, *args, **kwargs)
-        query_cache[query] = result
+        query, params = _query_args(args, kwargs)
+        if not query or not is_read_only(query):
+            return func(conn, *args, **kwargs)
+
+        def execute():
+            print("Executing and caching result.")
+            return func(conn, *args, **kwargs)
+
+        # Remember the tables read so committed writes can invalidate it
+        result, cached = get_query_cache().get_or_compute(
+            cache_key(conn, query, params), execute, tables=read_tables(query))
+        if cached:
+            print("Returning cached result.")
+        return result
+    return wrapper
+
+# cache_query for coroutine functions taking an async connection (aiosqlite)
+def async_cache_query(func):
+    @functools.wraps(func)
+    async def wrapper(conn, *args, **kwargs):
+        query, params = _query_args(args, kwargs)
+        if not query or not is_read_only(query):
+            return await func(conn, *args, **kwargs)
+
+        def execute():
+            print("Executing and caching result.")
+            return func(conn, *args, **kwargs)
+
+        result, cached = await get_query_cache().aget_or_compute(
+            await async_cache_key(conn, query, params), execute,
+            tables=read_tables(query))
+        if cached:
+            print("Returning cached result.")
         return result
     return wrapper
 
@@ -0,0 +1,789 @@
+import asyncio
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+
+def _sizeof(value):
+    # Approximate deep size of a query result (rows of plain values)
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(_sizeof(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return size
+
+
+class QueryCache:
+    """Size-bounded LRU cache for query results with an optional TTL.
+
+    Entries are evicted least recently used first once there are more than
+    `max_entries` of them or their estimated size passes `max_bytes`;
+    entries older than `ttl` seconds are treated as misses and dropped.
+
+    All methods are thread-safe. get_or_compute() and aget_or_compute()
+    add single-flight semantics: concurrent misses on one key run the
+    query once and every waiter gets that result (or its exception).
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._tables = {}  # key -> (db_path, table) pairs it depends on
+        self._dependents = defaultdict(set)  # (db_path, table) -> keys
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self._lock = threading.RLock()
+        self._inflight = {}  # key -> _Flight (threads)
+        self._ainflight = {}  # (loop, key) -> _Flight with a future
+
+    def __len__(self):
+        with self._lock:
+            return self._totals()[0]
+
+    def _totals(self):
+        return len(self._entries), self.bytes
+
+    def __contains__(self, key):
+        return self.get(key, count=False)[0]
+
+    def get(self, key, count=True):
+        with self._lock:
+            return self._get(key, count)
+
+    def _get(self, key, count):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            if count:
+                self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        if count:
+            self.hits += 1
+        return True, entry[0]
+
+    # `tables` are the tables the result was read from, for invalidation
+    def set(self, key, value, tables=()):
+        size = _sizeof(value)
+        with self._lock:
+            self._set(key, value, tables, size)
+
+    # `snapshot` is from _snapshot() before the value was computed
+    def _set(self, key, value, tables, size, snapshot=None):
+        if key in self._entries:
+            self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Would evict everything and still not fit
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at, size)
+        self.bytes += size
+        self._tables[key] = _dependencies(key, tables)
+        for dependency in self._tables[key]:
+            self._dependents[dependency].add(key)
+        while (len(self._entries) > self.max_entries
+               or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+        for dependency in self._tables.pop(key, ()):
+            keys = self._dependents[dependency]
+            keys.discard(key)
+            if not keys:
+                del self._dependents[dependency]
+
+    # Drop every entry that read one of `tables` in the database at db_path,
+    # or every entry of that database if `tables` holds ANY_TABLE
+    def invalidate_tables(self, db_path, tables):
+        dependencies = {(db_path, table) for table in tables}
+        if ANY_TABLE in tables:
+            dependencies.add((db_path, _DATABASE))
+        if dependencies:
+            dependencies.add((db_path, ANY_TABLE))
+        with self._lock:
+            removed = self._invalidate(dependencies)
+            # A query still running may have read the old rows: don't cache it
+            for flight in self._flights():
+                if flight.tables & dependencies:
+                    flight.stale = True
+            self.invalidations += removed
+        return removed
+
+    def _invalidate(self, dependencies):
+        removed = 0
+        for dependency in dependencies:
+            for key in list(self._dependents.get(dependency, ())):
+                self._remove(key)
+                removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            for flight in self._flights():
+                flight.stale = True
+
+    def _clear(self):
+        self._entries.clear()
+        self._tables.clear()
+        self._dependents.clear()
+        self.bytes = 0
+
+    # Hook for caches shared with other processes, whose invalidations the
+    # in-flight bookkeeping above cannot see: _set() checks it atomically
+    def _snapshot(self, dependencies):
+        return None
+
+    def _flights(self):
+        return list(self._inflight.values()) + list(self._ainflight.values())
+
+    def get_or_compute(self, key, compute, tables=()):
+        """Return (value, from_cache), running compute() once per key.
+
+        The first caller to miss runs compute(); callers missing on the same
+        key meanwhile block until it finishes and share its outcome.
+        """
+        with self._lock:
+            found, value = self._get(key, True)
+            if found:
+                return value, True
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight(
+                    _dependencies(key, tables)
+                )
+                flight.snapshot = self._snapshot(flight.tables)
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            flight.value = compute()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and not flight.stale:
+                    self._set(key, flight.value, tables,
+                              _sizeof(flight.value), flight.snapshot)
+            flight.done.set()
+        return flight.value, False
+
+    async def aget_or_compute(self, key, compute, tables=()):
+        """Async single-flight: `compute` is a coroutine function.
+
+        Coalesces callers on the running event loop; waiting callers are
+        shielded so one of them being cancelled does not cancel the query.
+        If the caller running the query is cancelled, the waiters retry and
+        one of them runs it instead.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                found, value = self._get(key, True)
+                if found:
+                    return value, True
+                # Futures belong to one loop, so coalesce per event loop
+                flight = self._ainflight.get((loop, key))
+                leader = flight is None
+                if leader:
+                    flight = self._ainflight[loop, key] = _Flight(
+                        _dependencies(key, tables)
+                    )
+                    flight.future = loop.create_future()
+                    flight.snapshot = self._snapshot(flight.tables)
+                else:
+                    self.coalesced += 1
+            if leader:
+                break
+            try:
+                return await asyncio.shield(flight.future), True
+            except asyncio.CancelledError:
+                if not flight.future.cancelled() or _cancelling():
+                    raise  # This caller was cancelled
+                # Only the leader was: try again, possibly as the new leader
+
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            flight.future.cancel()
+            raise
+        except BaseException as error:
+            flight.future.set_exception(error)
+            flight.future.exception()  # Mark retrieved when nobody waits
+            raise
+        finally:
+            with self._lock:
+                del self._ainflight[loop, key]
+        with self._lock:
+            if not flight.stale:
+                self._set(key, value, tables, _sizeof(value), flight.snapshot)
+        flight.future.set_result(value)
+        return value, False
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._totals()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "coalesced": self.coalesced,
+        }
+
+
+# Whether cancel() was requested on the current task (Python 3.11+)
+def _cancelling():
+    task = asyncio.current_task()
+    return bool(getattr(task, "cancelling", lambda: 0)())
+
+
+# Pseudo-table every entry depends on, so that a write to an unidentified
+# table (ANY_TABLE) can invalidate its whole database
+_DATABASE = ""
+
+
+# The (db_path, table) pairs an entry for `key` depends on
+def _dependencies(key, tables):
+    db_path = key[0] if isinstance(key, tuple) else ""
+    return {(db_path, table) for table in tables} | {(db_path, _DATABASE)}
+
+
+class _Flight:
+    def __init__(self, tables):
+        self.tables = tables
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False
+        self.future = None
+        self.snapshot = None
+
+
+# Results above this many pickled bytes are stored zlib-compressed
+_COMPRESS_OVER = 1024
+
+
+def _dumps(value):
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) > _COMPRESS_OVER:
+        return b"z" + zlib.compress(data, 1)
+    return b"p" + data
+
+
+def _loads(blob):
+    data = blob[1:]
+    if blob[:1] == b"z":
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+def _digest(key):
+    return hashlib.blake2b(
+        pickle.dumps(key, pickle.HIGHEST_PROTOCOL), digest_size=16
+    ).digest()
+
+
+class SQLiteQueryCache(QueryCache):
+    """QueryCache stored in a SQLite file shared by local processes.
+
+    Worker processes pointed at the same file share warm entries, so a
+    freshly started worker does not begin with an empty cache. Results are
+    pickled (zlib-compressed past 1 KiB) and sizes are the stored sizes.
+    TTL and LRU bounds apply to the file as a whole; invalidations reach
+    every process, including queries that were running in another one.
+    Only point it at a file you trust: entries are unpickled when read.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key BLOB PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL,
+            used_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at);
+        CREATE TABLE IF NOT EXISTS dependencies (
+            db_path TEXT NOT NULL,
+            tbl TEXT NOT NULL,
+            key BLOB NOT NULL REFERENCES entries (key) ON DELETE CASCADE,
+            PRIMARY KEY (db_path, tbl, key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS dependencies_key ON dependencies (key);
+        CREATE TABLE IF NOT EXISTS versions (
+            db_path TEXT NOT NULL,
+            tbl TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (db_path, tbl)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 ttl=None):
+        super().__init__(max_entries, max_bytes, ttl)
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    def _db(self):
+        # A connection must not cross fork(): reopen in each worker
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(self._SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _totals(self):
+        return self._db().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+
+    def _get(self, key, count):
+        digest = _digest(key)
+        row = self._db().execute(
+            "SELECT value, expires_at, used_at FROM entries WHERE key = ?",
+            (digest,),
+        ).fetchone()
+        now = time.time()
+        if row is not None and row[1] is not None and row[1] <= now:
+            self._db().execute("DELETE FROM entries WHERE key = ?", (digest,))
+            self.expirations += 1
+            row = None
+        if row is None:
+            if count:
+                self.misses += 1
+            return False, None
+        # Refresh the LRU clock at most once a second to keep hits read-only
+        if now - row[2] >= 1:
+            self._db().execute(
+                "UPDATE entries SET used_at = ? WHERE key = ?", (now, digest)
+            )
+        if count:
+            self.hits += 1
+        return True, _loads(row[0])
+
+    def _set(self, key, value, tables, size, snapshot=None):
+        blob = _dumps(value)
+        if self.max_bytes is not None and len(blob) > self.max_bytes:
+            return
+        digest = _digest(key)
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._transaction() as db:
+            # Checked under the write lock so no invalidation can slip in
+            # between the check and the insert
+            if snapshot is not None and self._snapshot(snapshot) != snapshot:
+                return
+            db.execute("DELETE FROM entries WHERE key = ?", (digest,))
+            db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                (digest, blob, len(blob), expires_at, now),
+            )
+            db.executemany(
+                "INSERT INTO dependencies VALUES (?, ?, ?)",
+                [(db_path, table, digest)
+                 for db_path, table in _dependencies(key, tables)],
+            )
+            self.expirations += db.execute(
+                "DELETE FROM entries WHERE expires_at <= ?", (now,)
+            ).rowcount
+            self._evict(db)
+
+    def _evict(self, db):
+        entries, size = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        while (entries > self.max_entries
+               or (self.max_bytes is not None and size > self.max_bytes)):
+            oldest = db.execute(
+                "SELECT key, size FROM entries ORDER BY used_at LIMIT 64"
+            ).fetchall()
+            for digest, entry_size in oldest:
+                if not (entries > self.max_entries
+                        or (self.max_bytes is not None and size > self.max_bytes)):
+                    break
+                db.execute("DELETE FROM entries WHERE key = ?", (digest,))
+                entries -= 1
+                size -= entry_size
+                self.evictions += 1
+
+    def _invalidate(self, dependencies):
+        removed = 0
+        with self._transaction() as db:
+            for db_path, table in dependencies:
+                removed += db.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM "
+                    "dependencies WHERE db_path = ? AND tbl = ?)",
+                    (db_path, table),
+                ).rowcount
+                db.execute(
+                    "INSERT INTO versions VALUES (?, ?, 1) ON CONFLICT (db_path, tbl) "
+                    "DO UPDATE SET version = version + 1",
+                    (db_path, table),
+                )
+        return removed
+
+    def _clear(self):
+        with self._transaction() as db:
+            db.execute("DELETE FROM entries")
+            db.execute("UPDATE versions SET version = version + 1")
+
+    # Table versions before a query runs; its result is only stored if no
+    # process invalidated one of its tables in the meantime
+    def _snapshot(self, dependencies):
+        db = self._db()
+        return {
+            dependency: db.execute(
+                "SELECT version FROM versions WHERE db_path = ? AND tbl = ?",
+                dependency,
+            ).fetchone()
+            for dependency in dependencies
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+# Path of the connection's main database file ("" for in-memory)
+def database_path(conn):
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path
+    return ""
+
+
+def _freeze(params):
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+
+# Results depend on the database and the bound parameters, not just the SQL
+def cache_key(conn, query, params=None):
+    return database_path(conn), query, _freeze(params)
+
+
+# cache_key() for async connections such as aiosqlite's
+async def async_cache_key(conn, query, params=None):
+    cursor = await conn.execute("PRAGMA database_list")
+    path = ""
+    for _, name, file in await cursor.fetchall():
+        if name == "main":
+            path = file
+    await cursor.close()
+    return path, query, _freeze(params)
+
+
+_NAME = r'[`"\[]?(\w+)[`"\]]?(?:\s*\.\s*[`"\[]?(\w+)[`"\]]?)?'
+_WRITE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|"
+    r"UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM|"
+    r"(?:DROP|ALTER)\s+TABLE(?:\s+IF\s+EXISTS)?)\s+(?!IF\s+EXISTS\b)" + _NAME
+    # A name followed by anything else was not fully understood
+    + r"(?=[\s(;]|$)",
+    re.IGNORECASE,
+)
+
+
+def _table(match):
+    # schema.table -> table
+    return (match.group(2) or match.group(1)).lower()
+
+
+# Dependency of a query whose FROM clause could not be parsed: any write
+# to its database invalidates it. As a written table, a write whose target
+# could not be identified: it invalidates every entry of its database.
+ANY_TABLE = "*"
+
+_TOKEN = re.compile(
+    r"""\s+|--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'"""
+    r"""|("(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|\w+)|(\S)""",
+    re.DOTALL,
+)
+# Keywords that end a table reference (so they are never aliases)
+_CLAUSE = {
+    "AS", "CROSS", "EXCEPT", "FETCH", "FOR", "FROM", "FULL", "GROUP",
+    "HAVING", "INDEXED", "INNER", "INTERSECT", "JOIN", "LEFT", "LIMIT",
+    "NATURAL", "NOT", "OFFSET", "ON", "ORDER", "OUTER", "RETURNING", "RIGHT",
+    "SELECT", "UNION", "USING", "VALUES", "WHERE", "WINDOW",
+}
+
+
+# (kind, text) pairs: "name" (unquoted, lowercased), "kw", "sym" or "lit"
+def _tokens(query):
+    tokens = []
+    for match in _TOKEN.finditer(query):
+        word, symbol = match.groups()
+        if symbol is not None:
+            tokens.append(("sym", symbol))
+        elif word is None:
+            if match.group().startswith("'"):
+                tokens.append(("lit", match.group()))
+        elif word[0] in "\"`[":
+            tokens.append(("name", word[1:-1].lower()))
+        elif word[0].isdigit():
+            tokens.append(("lit", word))
+        elif word.upper() in _CLAUSE:
+            tokens.append(("kw", word.upper()))
+        else:
+            tokens.append(("name", word.lower()))
+    return tokens
+
+
+def _closing(tokens, i):
+    # Index of the ")" matching the "(" at tokens[i]
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] == ("sym", "("):
+            depth += 1
+        elif tokens[j] == ("sym", ")"):
+            depth -= 1
+            if not depth:
+                return j
+    return len(tokens)
+
+
+# Read the table references after FROM or JOIN starting at tokens[i],
+# following comma-separated lists; returns the index after them
+def _table_list(tokens, i, tables):
+    while True:
+        kind, text = tokens[i] if i < len(tokens) else (None, None)
+        if kind == "name":
+            i += 1
+            qualified = tokens[i:i + 2]
+            if (len(qualified) == 2 and qualified[0] == ("sym", ".")
+                    and qualified[1][0] == "name"):
+                text = qualified[1][1]  # schema.table -> table
+                i += 2
+            if tokens[i:i + 1] == [("sym", "(")]:
+                tables.add(ANY_TABLE)  # Table-valued function
+                return i
+            tables.add(text)
+        elif (kind, text) == ("sym", "("):
+            end = _closing(tokens, i)
+            inner = tokens[i + 1:end]
+            if inner[:1] in ([("kw", "SELECT")], [("name", "with")],
+                             [("kw", "VALUES")]):
+                tables.update(_read(inner))  # Subquery
+            else:
+                start = _table_list(inner, 0, tables)  # (a JOIN b ON ...)
+                tables.update(_read(inner[start:]))
+            i = end + 1
+        else:
+            tables.add(ANY_TABLE)
+            return i
+        if tokens[i:i + 1] == [("kw", "AS")]:
+            i += 2
+        elif tokens[i:i + 1] and tokens[i][0] == "name":
+            i += 1  # Alias
+        if tokens[i:i + 1] == [("kw", "INDEXED")]:
+            i += 3  # INDEXED BY index
+        elif tokens[i:i + 2] == [("kw", "NOT"), ("kw", "INDEXED")]:
+            i += 2
+        if tokens[i:i + 1] != [("sym", ",")]:
+            return i
+        i += 1
+
+
+def _read(tokens):
+    tables = set()
+    i = 0
+    while i < len(tokens):
+        if tokens[i] in (("kw", "FROM"), ("kw", "JOIN")):
+            i = _table_list(tokens, i + 1, tables)
+        else:
+            i += 1
+    return tables
+
+
+# Tables a SELECT reads from, ANY_TABLE if some could not be identified
+def read_tables(query):
+    return _read(_tokens(query))
+
+
+# Statements that start the statement proper after a WITH clause
+_MAIN = {"DELETE", "INSERT", "REPLACE", "SELECT", "UPDATE", "VALUES"}
+# Statements that never change table contents
+_NO_WRITE = {"BEGIN", "COMMIT", "END", "PRAGMA", "RELEASE", "ROLLBACK",
+             "SAVEPOINT", "SELECT", "VALUES"}
+_DML = {"DELETE", "INSERT", "UPDATE"}
+
+
+# The statement with leading comments and any WITH clause skipped, and
+# whether it had a WITH clause
+def _statement(query):
+    depth, with_clause = 0, False
+    for match in _TOKEN.finditer(query):
+        word, symbol = match.groups()
+        if word is None and symbol is None:
+            continue  # Whitespace or a comment
+        if not with_clause:
+            if word is not None and word.upper() == "WITH":
+                with_clause = True
+                continue
+            return query[match.start():], False
+        if symbol == "(":
+            depth += 1
+        elif symbol == ")":
+            depth -= 1
+        elif not depth and word is not None and word.upper() in _MAIN:
+            return query[match.start():], True
+    return "", with_clause
+
+
+def _first_word(statement):
+    match = re.match(r"\w+", statement)
+    return match.group().upper() if match else ""
+
+
+# Tables a statement writes to: its target, ANY_TABLE if it may write but
+# the target could not be identified, nothing for reads and transaction
+# control
+def written_tables(query):
+    statement, _ = _statement(query)
+    match = _WRITE.match(statement)
+    if match:
+        return {_table(match)}
+    if not statement or _first_word(statement) in _NO_WRITE:
+        return set()
+    return {ANY_TABLE}
+
+
+# A SELECT, including one after a WITH clause whose CTEs do not modify
+# data (WITH d AS (DELETE ... RETURNING *) SELECT ...)
+def is_read_only(query):
+    statement, with_clause = _statement(query)
+    if _first_word(statement) not in ("SELECT", "VALUES"):
+        return False
+    return not with_clause or not any(
+        kind == "name" and text.upper() in _DML for kind, text in _tokens(query)
+    )
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+# The cache shared by cache_query and the write-side decorators in this
+# project: in-process, or a SQLite file shared by workers when
+# QUERY_CACHE_PATH is set
+def get_query_cache():
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            path = os.environ.get("QUERY_CACHE_PATH")
+            if path:
+                _query_cache = SQLiteQueryCache(path, ttl=300)
+            else:
+                _query_cache = QueryCache(ttl=300)
+        return _query_cache
+
+
+def set_query_cache(cache):
+    global _query_cache
+    with _query_cache_lock:
+        _query_cache = cache
+
+
+# id(conn) -> the sets collecting its writes, innermost last
+# (sqlite3 connections cannot be weakly referenced)
+_collectors = {}
+_collectors_lock = threading.Lock()
+
+
+# Collect the tables written through `conn` while the block runs, using
+# sqlite3's trace callback so every statement is seen whatever issued it.
+# Blocks may nest on one connection (a transactional function calling
+# another) and the callback stays installed until the last one exits. An
+# inner block also starts with the writes its outer blocks have collected,
+# since committing it commits those too.
+@contextmanager
+def track_writes(conn):
+    with _collectors_lock:
+        collectors = _collectors.setdefault(id(conn), [])
+        written = set().union(*collectors)
+        collectors.append(written)
+        first = len(collectors) == 1
+
+    if first:
+        def trace(statement):
+            tables = written_tables(statement)
+            if tables:
+                for collector in list(collectors):
+                    collector.update(tables)
+
+        conn.set_trace_callback(trace)
+    try:
+        yield written
+    finally:
+        with _collectors_lock:
+            # By identity: sets that compare equal may belong to other blocks
+            collectors[:] = [c for c in collectors if c is not written]
+            last = not collectors
+            if last:
+                del _collectors[id(conn)]
+        if last:
+            conn.set_trace_callback(None)
+
+
+# Call after a successful COMMIT with the tables from track_writes
+def invalidate_writes(conn, tables, cache=None):
+    cache = get_query_cache() if cache is None else cache
+    if tables:
+        return cache.invalidate_tables(database_path(conn), tables)
+    return 0
@@ -0,0 +1,150 @@
+import functools
+import os
+import sqlite3
+import threading
+import weakref
+
+# Applied once when a connection is opened, not on every call
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # KiB, i.e. 16 MB of page cache per connection
+}
+
+
+# A thread's connection. Only the thread-local holds it, so it is closed
+# by its finalizer once the thread exits.
+class _Slot:
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+        self.close = weakref.finalize(self, conn.close)
+
+
+class ThreadLocalPool:
+    """One reusable sqlite3 connection per thread for a database file.
+
+    sqlite3 connections must stay on the thread that opened them, so
+    instead of a shared queue each thread keeps its own connection open
+    and gets it back on every call. A connection is closed when its thread
+    exits, and replaced when the caller closed it. A forked child closes
+    the connections inherited from its parent and opens its own.
+    """
+
+    def __init__(self, path, pragmas=None):
+        self.path = path
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slots = weakref.WeakSet()
+        self.opened = 0
+        self.reused = 0
+        self.rollbacks = 0
+        _pools_alive.add(self)
+
+    def _open(self):
+        # Used by one thread at a time, but closed by whichever thread
+        # drops the last reference to its slot
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        slot = _Slot(conn)
+        with self._lock:
+            self._slots.add(slot)
+            self.opened += 1
+        return slot
+
+    @staticmethod
+    def _usable(conn):
+        try:
+            conn.in_transaction
+        except sqlite3.ProgrammingError:  # Closed by the caller
+            return False
+        return True
+
+    def acquire(self):
+        slot = getattr(self._local, "slot", None)
+        if slot is not None and self._usable(slot.conn):
+            with self._lock:
+                self.reused += 1
+        else:
+            slot = self._local.slot = self._open()
+        slot.depth += 1
+        return slot.conn
+
+    # Closing used to discard uncommitted work; roll it back instead, once
+    # the outermost decorated call on this thread returns
+    def release(self, conn):
+        slot = getattr(self._local, "slot", None)
+        if slot is None or slot.conn is not conn:
+            return  # close_all() ran during the call
+        slot.depth -= 1
+        if slot.depth or not self._usable(conn):
+            return
+        if conn.in_transaction:
+            conn.rollback()
+            with self._lock:
+                self.rollbacks += 1
+
+    def close_all(self):
+        with self._lock:
+            slots, self._slots = list(self._slots), weakref.WeakSet()
+            self._local = threading.local()
+        for slot in slots:
+            slot.close()
+
+    def _after_fork(self):
+        # The parent's threads are gone and the lock may have been held
+        self._lock = threading.Lock()
+        self.close_all()
+
+    def stats(self):
+        calls = self.opened + self.reused
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "rollbacks": self.rollbacks,
+            "reuse_ratio": self.reused / calls if calls else 0.0,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_alive = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in list(_pools_alive):
+        pool._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+# The pool for `path`, defaulting to USERS_DB_PATH (users.db)
+def get_pool(path=None):
+    path = path or os.environ.get("USERS_DB_PATH", "users.db")
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ThreadLocalPool(path)
+        return _pools[path]
+
+
+# Pass a pooled connection as the first argument. Use as @with_db_connection
+# or @with_db_connection(path="other.db").
+def with_db_connection(func=None, *, path=None):
+    if func is None:
+        return functools.partial(with_db_connection, path=path)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        pool = get_pool(path)
+        conn = pool.acquire()
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            pool.release(conn)
+    return wrapper
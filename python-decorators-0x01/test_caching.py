@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the query result caches in the caching module.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from caching import (
+    ANY_TABLE, QueryCache, SQLiteQueryCache, cache_key, invalidate_writes,
+    is_read_only, read_tables, track_writes, written_tables,
+)
+
+
+class TestQueryCache(unittest.TestCase):
+    """
+    Test LRU eviction, size bounds and TTL expiry of QueryCache.
+    """
+
+    def setUp(self) -> None:
+        """
+        Drive both of the cache's clocks from self.now.
+        """
+        self.now = 1_000_000.0
+        for name in ("monotonic", "time"):
+            patcher = patch(f"caching.time.{name}", side_effect=lambda: self.now)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def cache(self, **kwargs):
+        return QueryCache(**kwargs)
+
+    def test_evicts_least_recently_used(self) -> None:
+        """
+        Test the entry read least recently is evicted first.
+        """
+        cache = self.cache(max_entries=2)
+        cache.set("a", 1)
+        self.now += 2
+        cache.set("b", 2)
+        self.now += 2
+        cache.get("a")
+        self.now += 2
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("c"), (True, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_bounds_total_size(self) -> None:
+        """
+        Test entries are evicted to stay under max_bytes.
+        """
+        cache = self.cache(max_bytes=20_000)
+        for i in range(10):
+            cache.set(i, os.urandom(5_000))  # Incompressible
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 20_000)
+        self.assertLess(stats["entries"], 10)
+        self.assertEqual(cache.get(9)[0], True)
+
+    def test_skips_values_larger_than_max_bytes(self) -> None:
+        """
+        Test a value that can never fit is not stored.
+        """
+        cache = self.cache(max_bytes=1_000)
+        cache.set("small", "x")
+        cache.set("big", os.urandom(10_000))
+        self.assertNotIn("big", cache)
+        self.assertIn("small", cache)
+
+    def test_expires_after_ttl(self) -> None:
+        """
+        Test entries older than the TTL count as misses.
+        """
+        cache = self.cache(ttl=10)
+        cache.set("a", 1)
+        self.now += 9
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.now += 2
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_any_table_invalidates_database(self) -> None:
+        """
+        Test invalidating ANY_TABLE drops every entry of that database only.
+        """
+        cache = self.cache()
+        cache.set(("db", "users", ()), 1, tables={"users"})
+        cache.set(("db", "logs", ()), 2, tables={"logs"})
+        cache.set(("other", "users", ()), 3, tables={"users"})
+        self.assertEqual(cache.invalidate_tables("db", {ANY_TABLE}), 2)
+        self.assertNotIn(("db", "users", ()), cache)
+        self.assertIn(("other", "users", ()), cache)
+
+
+class TestSQLiteQueryCacheBounds(TestQueryCache):
+    """
+    Run the QueryCache tests against the shared SQLite-file cache.
+    """
+
+    def setUp(self) -> None:
+        """
+        Use a fresh cache file per test.
+        """
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.caches = []
+
+    def tearDown(self) -> None:
+        """
+        Close the caches and remove their file.
+        """
+        for cache in self.caches:
+            cache.close()
+        self.tmp.cleanup()
+
+    def cache(self, **kwargs):
+        cache = SQLiteQueryCache(os.path.join(self.tmp.name, "cache.db"), **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    def test_shared_between_instances(self) -> None:
+        """
+        Test that a second cache on the same file sees the entries.
+        """
+        writer, reader = self.cache(), self.cache()
+        writer.set(("db", "q", ()), [(1, "Ann")], tables={"users"})
+        self.assertEqual(reader.get(("db", "q", ())), (True, [(1, "Ann")]))
+        self.assertEqual(reader.invalidate_tables("db", {"users"}), 1)
+        self.assertEqual(writer.get(("db", "q", ())), (False, None))
+
+    def test_invalidation_during_compute_is_not_stored(self) -> None:
+        """
+        Test a result is dropped when another process invalidated its table.
+        """
+        cache, other = self.cache(), self.cache()
+        key = ("db", "SELECT * FROM users", ())
+
+        def compute():
+            other.invalidate_tables("db", {"users"})
+            return [1]
+
+        self.assertEqual(
+            cache.get_or_compute(key, compute, tables={"users"}), ([1], False)
+        )
+        self.assertNotIn(key, cache)
+
+    def test_any_table_during_compute_is_not_stored(self) -> None:
+        """
+        Test a result is dropped when another process wrote an unknown table.
+        """
+        cache, other = self.cache(), self.cache()
+        key = ("db", "SELECT * FROM users", ())
+
+        def compute():
+            other.invalidate_tables("db", {ANY_TABLE})
+            return [1]
+
+        cache.get_or_compute(key, compute, tables={"users"})
+        self.assertNotIn(key, cache)
+
+
+class TestTables(unittest.TestCase):
+    """
+    Test which tables a statement is recorded as reading or writing.
+    """
+
+    def test_read_tables(self) -> None:
+        """
+        Test every table in FROM lists, joins and subqueries is found.
+        """
+        cases = {
+            "SELECT * FROM users": {"users"},
+            "SELECT * FROM a, users WHERE a.id = users.id": {"a", "users"},
+            "select * from main.users u, \"Orders\" AS o join [x] on 1": {
+                "users", "orders", "x"},
+            "SELECT * FROM (SELECT id FROM users) t, logs": {"users", "logs"},
+            "SELECT * FROM (a JOIN b ON a.x = b.x), c": {"a", "b", "c"},
+            "SELECT * FROM t WHERE s = 'FROM zz, yy'": {"t"},
+            "SELECT * FROM users WHERE id IN (SELECT uid FROM bans)": {
+                "users", "bans"},
+            "SELECT 1": set(),
+        }
+        for query, tables in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(read_tables(query), tables)
+
+    def test_unparsed_from_depends_on_any_table(self) -> None:
+        """
+        Test table-valued functions fall back to the wildcard dependency.
+        """
+        self.assertIn(ANY_TABLE, read_tables("SELECT * FROM json_each(?)"))
+
+    def test_written_tables(self) -> None:
+        """
+        Test the target table of write statements is found.
+        """
+        self.assertEqual(written_tables("UPDATE users SET a = 1"), {"users"})
+        self.assertEqual(
+            written_tables("INSERT OR REPLACE INTO main.Users VALUES (1)"),
+            {"users"},
+        )
+        self.assertEqual(written_tables("SELECT * FROM users"), set())
+
+    def test_written_tables_after_comments_and_with(self) -> None:
+        """
+        Test leading comments and WITH clauses are skipped to the target.
+        """
+        cases = {
+            "/* audit */ UPDATE users SET email = 'x'": {"users"},
+            "-- note\nDELETE FROM logs": {"logs"},
+            "WITH v AS (SELECT 'x' AS e) UPDATE users SET email = "
+            "(SELECT e FROM v)": {"users"},
+            "WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r "
+            "WHERE n < 3), s AS (SELECT 2) INSERT INTO logs SELECT n FROM r": {
+                "logs"},
+        }
+        for statement, tables in cases.items():
+            with self.subTest(statement=statement):
+                self.assertEqual(written_tables(statement), tables)
+
+    def test_unidentified_write_is_any_table(self) -> None:
+        """
+        Test statements that may write to an unknown table give ANY_TABLE.
+        """
+        for statement in ("DROP INDEX users_name", "CREATE TABLE t (a)",
+                          "WITH v AS (SELECT 1) DELETE users"):
+            with self.subTest(statement=statement):
+                self.assertEqual(written_tables(statement), {ANY_TABLE})
+        for statement in ("BEGIN ", "COMMIT", "ROLLBACK TO s", "SAVEPOINT s",
+                          "RELEASE s", "PRAGMA user_version", "SELECT 1",
+                          "WITH v AS (SELECT 1) SELECT * FROM v", ""):
+            with self.subTest(statement=statement):
+                self.assertEqual(written_tables(statement), set())
+
+    def test_is_read_only(self) -> None:
+        """
+        Test only SELECTs, including after harmless CTEs, are read-only.
+        """
+        cases = {
+            "SELECT * FROM users": True,
+            "/* report */ select 1": True,
+            "WITH v AS (SELECT id FROM users) SELECT * FROM v": True,
+            "WITH v AS (SELECT 1) DELETE FROM users RETURNING *": False,
+            "WITH d AS (DELETE FROM users RETURNING *) SELECT * FROM d": False,
+            "WITH v AS (SELECT 1) UPDATE users SET a = 1 RETURNING a": False,
+            "UPDATE users SET a = 1": False,
+            "SELECT * FROM t WHERE op = 'DELETE'": True,
+        }
+        for query, read_only in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(is_read_only(query), read_only)
+
+
+class TestInvalidation(unittest.TestCase):
+    """
+    Test committed writes invalidate the cached reads of their tables.
+    """
+
+    def setUp(self) -> None:
+        """
+        Create a users table in a temporary database file.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, "users.db"))
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        self.conn.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY)")
+        self.conn.execute("INSERT INTO users (name) VALUES ('Ann')")
+        self.conn.commit()
+        self.cache = QueryCache()
+
+    def tearDown(self) -> None:
+        """
+        Close the connection and remove the database.
+        """
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def read(self, query):
+        return self.cache.get_or_compute(
+            cache_key(self.conn, query),
+            lambda: self.conn.execute(query).fetchall(),
+            tables=read_tables(query),
+        )
+
+    def write(self, statement):
+        with track_writes(self.conn) as written:
+            self.conn.execute(statement)
+            self.conn.commit()
+        return invalidate_writes(self.conn, written, self.cache)
+
+    def test_write_invalidates_comma_join(self) -> None:
+        """
+        Test a write to the second table of a comma join invalidates it.
+        """
+        query = "SELECT users.name FROM logs, users"
+        self.read(query)
+        self.assertEqual(self.write("UPDATE users SET name = 'Bob'"), 1)
+        self.assertEqual(self.read(query), ([], False))
+
+    def test_write_to_other_table_keeps_entry(self) -> None:
+        """
+        Test writes to unrelated tables leave the entry cached.
+        """
+        self.read("SELECT * FROM users")
+        self.assertEqual(self.write("INSERT INTO logs DEFAULT VALUES"), 0)
+        self.assertEqual(self.read("SELECT * FROM users")[1], True)
+
+    def test_commented_write_invalidates(self) -> None:
+        """
+        Test a write after a leading comment still invalidates its table.
+        """
+        self.read("SELECT * FROM users")
+        self.assertEqual(
+            self.write("/* audit */ UPDATE users SET name = 'Bob'"), 1
+        )
+
+    def test_write_after_with_invalidates(self) -> None:
+        """
+        Test a write after a WITH clause invalidates its table.
+        """
+        self.read("SELECT * FROM users")
+        self.assertEqual(self.write(
+            "WITH v AS (SELECT 'Bob' AS name) "
+            "UPDATE users SET name = (SELECT name FROM v)"
+        ), 1)
+
+    def test_unidentified_write_invalidates_database(self) -> None:
+        """
+        Test a write with no recognised target drops every entry of the db.
+        """
+        self.read("SELECT * FROM users")
+        self.read("SELECT * FROM logs")
+        self.assertEqual(self.write("DROP TABLE IF EXISTS main.'logs'"), 2)
+
+    def test_nested_tracking(self) -> None:
+        """
+        Test an inner track_writes block does not stop the outer one.
+        """
+        with track_writes(self.conn) as outer:
+            with track_writes(self.conn) as inner:
+                self.conn.execute("UPDATE users SET name = 'Bob'")
+            self.conn.execute("INSERT INTO logs DEFAULT VALUES")
+        self.conn.execute("DELETE FROM users")
+        self.assertEqual(inner, {"users"})
+        self.assertEqual(outer, {"users", "logs"})
+
+    def test_nested_commit_invalidates_outer_writes(self) -> None:
+        """
+        Test an inner block's commit also invalidates the outer's writes.
+        """
+        self.read("SELECT * FROM users")
+        with track_writes(self.conn):
+            self.conn.execute("UPDATE users SET name = 'Bob'")
+            with track_writes(self.conn) as inner:
+                self.conn.execute("INSERT INTO logs DEFAULT VALUES")
+                self.conn.commit()
+            self.assertEqual(invalidate_writes(self.conn, inner, self.cache), 1)
+
+    def test_any_write_invalidates_wildcard(self) -> None:
+        """
+        Test an entry with an unparsed FROM is invalidated by any write.
+        """
+        self.read("SELECT * FROM json_each('[1]')")
+        self.assertEqual(self.write("INSERT INTO logs DEFAULT VALUES"), 1)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    Test that concurrent misses on one key run the query once.
+    """
+
+    def test_threads_share_one_computation(self) -> None:
+        """
+        Test concurrent threads all get the value computed once.
+        """
+        cache = QueryCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_compute("k", compute))
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("value", False)] + [("value", True)] * 7)
+        self.assertEqual(cache.stats()["coalesced"], 7)
+
+    def test_threads_share_the_error(self) -> None:
+        """
+        Test every waiter sees the leader's exception and nothing is cached.
+        """
+        cache = QueryCache()
+        gate = threading.Event()
+
+        def compute():
+            gate.wait()
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                cache.get_or_compute("k", compute)
+            except RuntimeError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 4)
+        self.assertNotIn("k", cache)
+
+    def test_async_callers_share_one_computation(self) -> None:
+        """
+        Test concurrent tasks all get the value computed once.
+        """
+        cache = QueryCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def main():
+            return await asyncio.gather(
+                *(cache.aget_or_compute("k", compute) for _ in range(5))
+            )
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], ("value", False))
+        self.assertEqual(results[1:], [("value", True)] * 4)
+
+    def test_async_leader_cancellation_spares_waiters(self) -> None:
+        """
+        Test waiters rerun the query when only the leader was cancelled.
+        """
+        cache = QueryCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def main():
+            leader = asyncio.create_task(cache.aget_or_compute("k", compute))
+            await asyncio.sleep(0.01)
+            waiters = [
+                asyncio.create_task(cache.aget_or_compute("k", compute))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            return leader, waiters, results
+
+        leader, waiters, results = asyncio.run(main())
+        self.assertTrue(leader.cancelled())
+        self.assertFalse(any(waiter.cancelled() for waiter in waiters))
+        self.assertEqual([value for value, _ in results], [2, 2, 2])
+        self.assertEqual(len(calls), 2)
+
+    def test_invalidation_during_compute_is_not_stored(self) -> None:
+        """
+        Test a result read before a write committed is not cached.
+        """
+        cache = QueryCache()
+        key = ("db", "SELECT * FROM users", ())
+
+        def compute():
+            cache.invalidate_tables("db", {"users"})
+            return "stale"
+
+        self.assertEqual(
+            cache.get_or_compute(key, compute, tables={"users"}), ("stale", False)
+        )
+        self.assertNotIn(key, cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
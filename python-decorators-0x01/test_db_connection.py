@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-thread connection pool in the db_connection module.
+"""
+
+import gc
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from db_connection import ThreadLocalPool, with_db_connection
+
+
+def _closed(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+class TestThreadLocalPool(unittest.TestCase):
+    """
+    Test reuse, rollback and cleanup of pooled connections.
+    """
+
+    def setUp(self) -> None:
+        """
+        Create a users table in a temporary database file.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+        self.pool = ThreadLocalPool(self.path)
+
+    def tearDown(self) -> None:
+        """
+        Close the pool and remove the database.
+        """
+        self.pool.close_all()
+        self.tmp.cleanup()
+
+    def count(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_reuses_connection_per_thread(self) -> None:
+        """
+        Test a thread gets its own connection back on every call.
+        """
+        first = self.pool.acquire()
+        self.pool.release(first)
+        second = self.pool.acquire()
+        self.pool.release(second)
+        self.assertIs(first, second)
+        self.assertEqual(self.pool.stats()["opened"], 1)
+        self.assertEqual(self.pool.stats()["reused"], 1)
+
+        other = []
+
+        def worker():
+            conn = self.pool.acquire()
+            other.append(conn)
+            self.pool.release(conn)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], first)
+
+    def test_replaces_connection_closed_by_caller(self) -> None:
+        """
+        Test a connection the caller closed is not handed out again.
+        """
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        conn.close()
+        replacement = self.pool.acquire()
+        self.pool.release(replacement)
+        self.assertIsNot(replacement, conn)
+        self.assertFalse(_closed(replacement))
+
+    def test_rolls_back_after_outermost_call(self) -> None:
+        """
+        Test uncommitted work is rolled back once the outermost call returns.
+        """
+        outer = self.pool.acquire()
+        inner = self.pool.acquire()
+        inner.execute("INSERT INTO users (name) VALUES ('Ann')")
+        self.pool.release(inner)
+        self.assertTrue(outer.in_transaction)
+        self.pool.release(outer)
+        self.assertFalse(outer.in_transaction)
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(self.pool.stats()["rollbacks"], 1)
+
+    def test_closes_connection_when_thread_exits(self) -> None:
+        """
+        Test a thread's connection is closed once the thread has exited.
+        """
+        opened = []
+
+        def worker():
+            conn = self.pool.acquire()
+            opened.append(conn)
+            self.pool.release(conn)
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+        self.assertEqual(len(opened), 5)
+        self.assertTrue(all(_closed(conn) for conn in opened))
+        self.assertEqual(len(self.pool._slots), 0)
+
+    def test_close_all(self) -> None:
+        """
+        Test close_all closes open connections and later calls reopen.
+        """
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        self.pool.close_all()
+        self.assertTrue(_closed(conn))
+        reopened = self.pool.acquire()
+        self.pool.release(reopened)
+        self.assertFalse(_closed(reopened))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_forked_child_opens_its_own_connection(self) -> None:
+        """
+        Test a forked child does not reuse the parent's connection.
+        """
+        parent = self.pool.acquire()
+        self.pool.release(parent)
+        pid = os.fork()
+        if pid == 0:  # Child: report through the exit status only
+            try:
+                conn = self.pool.acquire()
+                conn.execute("INSERT INTO users (name) VALUES ('child')")
+                conn.commit()
+                self.pool.release(conn)
+                ok = _closed(parent) and conn is not parent
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertFalse(_closed(parent))
+        self.assertEqual(self.count(), 1)
+
+
+class TestWithDbConnection(unittest.TestCase):
+    """
+    Test the decorator passes a pooled connection for the given path.
+    """
+
+    def test_passes_pooled_connection(self) -> None:
+        """
+        Test calls share this thread's connection to the given database.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "other.db")
+
+            @with_db_connection(path=path)
+            def connection(conn):
+                return conn
+
+            @with_db_connection(path=path)
+            def database(conn):
+                return conn.execute("PRAGMA database_list").fetchone()[2]
+
+            self.assertIs(connection(), connection())
+            self.assertEqual(os.path.realpath(database()),
+                             os.path.realpath(path))
+            connection().close()
+
+
+if __name__ == "__main__":
+    unittest.main()
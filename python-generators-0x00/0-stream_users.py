@@ -1,23 +1,48 @@
-import mysql.connector
+from contextlib import closing
 
+from connection_pool import get_connection, open_cursor
+from predicates import quote_identifier
 
-def stream_users():
-    connection = mysql.connector.connect(
-        host="localhost", user="root", password="", database="ALX_prodev"
-    )
-    cursor = connection.cursor(dictionary=True)
 
-    cursor.execute("SELECT * FROM user_data")
-    for row in cursor:
-        yield row
+# fetch_size switches to an explicitly unbuffered cursor that pulls rows
+# from the server `fetch_size` at a time, so only one fetch is held in client
+# memory and the first row arrives before the query has been fully read.
+# row_factory (e.g. rows.UserRow) builds each row from a plain tuple of its
+# COLUMNS instead of a dict.
+def stream_users(fetch_size=None, row_factory=None):
+    options = {"dictionary": row_factory is None}
+    if fetch_size is not None:
+        options["buffered"] = False
+    query = "SELECT * FROM user_data"
+    if row_factory is not None:
+        columns = ", ".join(quote_identifier(c) for c in row_factory.COLUMNS)
+        query = f"SELECT {columns} FROM user_data"
+    with get_connection() as connection, \
+            open_cursor(connection, **options) as cursor:
+        cursor.execute(query)
+        if fetch_size is None:
+            rows = cursor
+        else:
+            rows = _fetch_all(cursor, fetch_size)
+        if row_factory is None:
+            yield from rows
+        else:
+            for row in rows:
+                yield row_factory(*row)
 
-    cursor.close()
-    connection.close()
+def _fetch_all(cursor, fetch_size):
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        yield from rows
 
 
 # Main function to demonstrate the generator
 if __name__ == "__main__":
-    for i, user in enumerate(stream_users()):
-        if i >= 6:
-            break
-        print(user)
+    # closing() releases the cursor and connection as soon as we stop early
+    with closing(stream_users()) as users:
+        for i, user in enumerate(users):
+            if i >= 6:
+                break
+            print(user)
@@ -1,28 +1,71 @@
-import mysql.connector
+import time
 
-def stream_users_in_batches(batch_size):
-    connection = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="ALX_prodev"
-    )
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM user_data")
+from adaptive import AdaptiveBatchSize
+from columnar import ColumnarBatch
+from connection_pool import get_connection, open_cursor
+from predicates import build_select, col
 
-    while True:
-        batch = cursor.fetchmany(batch_size)
-        if not batch:
-            break
-        yield batch
+# `columns` and `where` are compiled into the SELECT; only predicate terms
+# that have no SQL form (see predicates.where) are evaluated in Python.
+# columnar=True yields ColumnarBatch objects (typed arrays per column)
+# instead of lists of dicts.
+# adaptive=True (or an AdaptiveBatchSize) reads from an unbuffered cursor
+# and retunes the fetch size after every fetch, starting from batch_size;
+# the chosen sizes are kept in its `history`.
+# row_factory (e.g. rows.UserRow) yields lists of its objects instead of
+# dicts; it selects its own COLUMNS, so it excludes columns= and columnar.
+def stream_users_in_batches(batch_size, columns=None, where=None, columnar=False,
+                            adaptive=None, row_factory=None):
+    if adaptive is True:
+        adaptive = AdaptiveBatchSize(initial=batch_size)
+    if row_factory is not None:
+        if columns is not None or columnar:
+            raise ValueError("row_factory cannot be combined with columns or columnar")
+        columns = row_factory.COLUMNS
+    options = {"dictionary": not columnar and row_factory is None}
+    if adaptive:
+        options["buffered"] = False
+    query, params, residual, project = build_select("user_data", columns, where)
+    if row_factory is not None and project is not None:
+        raise ValueError("row_factory predicates may only read its COLUMNS")
+    with get_connection() as connection, \
+            open_cursor(connection, **options) as cursor:
+        cursor.execute(query, params)
+        names = list(cursor.column_names)
+
+        while True:
+            if adaptive:
+                start = time.perf_counter()
+                batch = cursor.fetchmany(adaptive.size)
+                adaptive.record(batch, time.perf_counter() - start)
+            else:
+                batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            if columnar:
+                batch = _columnar_batch(names, batch, residual, project)
+                if len(batch):
+                    yield batch
+                continue
+            if row_factory is not None:
+                batch = [row_factory(*row) for row in batch]
+            if residual is not None:
+                batch = [row for row in batch if residual(row)]
+                if not batch:
+                    continue
+            if project is not None:
+                batch = [{name: row[name] for name in project} for row in batch]
+            yield batch
 
-    cursor.close()
-    connection.close()
+def _columnar_batch(names, rows, residual, project):
+    if residual is not None:
+        rows = [row for row in rows if residual(dict(zip(names, row)))]
+    if project is not None:
+        positions = [names.index(name) for name in project]
+        rows = [tuple(row[i] for i in positions) for row in rows]
+        names = list(project)
+    return ColumnarBatch.from_rows(names, rows)
 
 def batch_processing(batch_size):
-    for batch in stream_users_in_batches(batch_size):
-        filtered = []
-        for user in batch:
-            if user['age'] > 25:
-                filtered.append(user)
-        yield filtered
+    for batch in stream_users_in_batches(batch_size, where=col('age') > 25):
+        yield batch
@@ -1,25 +1,157 @@
-import mysql.connector
-
-def paginate_users(page_size, offset):
-    connection = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="ALX_prodev"
-    )
-    cursor = connection.cursor(dictionary=True)
-    query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
-    cursor.execute(query, (page_size, offset))
-    results = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return results
-
-def lazy_paginate(page_size):
-    offset = 0
+import base64
+import json
+import queue
+import threading
+from contextlib import nullcontext
+
+from connection_pool import get_connection, get_pool, open_cursor
+from predicates import quote_identifier
+
+# Use the caller's connection if given, otherwise check one out of the pool
+def _connection(connection=None):
+    return get_connection() if connection is None else nullcontext(connection)
+
+def paginate_users(page_size, offset, connection=None):
+    with _connection(connection) as connection, \
+            open_cursor(connection, dictionary=True) as cursor:
+        query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
+        cursor.execute(query, (page_size, offset))
+        return cursor.fetchall()
+
+# Keyset (seek) pagination: fetch the rows that come after `after` in `key`
+# order. user_id is unique and `after` is a plain value. Any other key may
+# repeat, so rows are ordered by (key, user_id) and `after` is the
+# (key, user_id) pair of the last row seen; seeking on the value alone
+# would skip the rows that share it at a page boundary.
+# Every page costs the same however deep only with an index matching the
+# ORDER BY: the primary key for user_id, an index on (key, user_id) for
+# any other key. user_data has none for age, say, so key="age" sorts the
+# whole table for every page.
+def paginate_users_after(page_size, after=None, key="user_id", connection=None):
+    column = quote_identifier(key)
+    order = "user_id" if key == "user_id" else f"{column}, user_id"
+    with _connection(connection) as connection, \
+            open_cursor(connection, dictionary=True) as cursor:
+        if after is None:
+            query = f"SELECT * FROM user_data ORDER BY {order} LIMIT %s"
+            cursor.execute(query, (page_size,))
+        elif key == "user_id":
+            query = (f"SELECT * FROM user_data WHERE user_id > %s "
+                     f"ORDER BY {order} LIMIT %s")
+            cursor.execute(query, (after, page_size))
+        else:
+            value, user_id = after
+            query = (f"SELECT * FROM user_data WHERE {column} > %s "
+                     f"OR ({column} = %s AND user_id > %s) "
+                     f"ORDER BY {order} LIMIT %s")
+            cursor.execute(query, (value, value, user_id, page_size))
+        return cursor.fetchall()
+
+# A page of rows that also carries the token to resume after it
+class Page(list):
+    next_token = None
+
+# Resume position after `row`: see paginate_users_after
+def _position(row, key):
+    return row[key] if key == "user_id" else [row[key], row["user_id"]]
+
+def encode_token(key, after):
+    payload = json.dumps({"key": key, "after": after}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_token(token):
+    payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+    return payload["key"], payload["after"]
+
+def _pages(page_size, keyset, key, token, connection=None):
+    if not keyset and token is None:
+        offset = 0
+        while True:
+            page = paginate_users(page_size, offset, connection)
+            if not page:
+                break
+            yield page
+            offset += page_size
+        return
+
+    # Keyset mode; a token from Page.next_token resumes an interrupted scan
+    after = None
+    if token is not None:
+        token_key, after = decode_token(token)
+        if token_key != key:
+            raise ValueError(
+                f"Token is for key {token_key!r}, not {key!r}; pass "
+                f"key={token_key!r} to resume it"
+            )
+        if key != "user_id" and not (isinstance(after, list) and len(after) == 2):
+            raise ValueError(f"Token for key {key!r} lacks the user_id tie-break")
     while True:
-        page = paginate_users(page_size, offset)
+        page = Page(paginate_users_after(page_size, after, key, connection))
         if not page:
             break
+        after = _position(page[-1], key)
+        page.next_token = encode_token(key, after)
         yield page
-        offset += page_size
+        if len(page) < page_size:
+            break
+
+_DONE = object()
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+# Fetch pages on a background thread into a queue of at most `depth` pages,
+# so the next queries overlap with the consumer's work on the current page.
+# The thread holds one connection for the whole scan. If the consumer stops
+# early, the thread stops and closes that connection as soon as its current
+# query returns, instead of putting it back in the pool.
+def _prefetch(page_size, keyset, key, token, depth):
+    pages = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        pool = get_pool()
+        try:
+            connection = pool.acquire()
+        except BaseException as error:
+            put(_Failed(error))
+            return
+        try:
+            for page in _pages(page_size, keyset, key, token, connection):
+                if not put(page):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as error:
+            put(_Failed(error))
+        finally:
+            pool.release(connection, discard=stop.is_set())
+
+    thread = threading.Thread(target=produce, name="lazy_paginate-prefetch",
+                              daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+def lazy_paginate(page_size, keyset=False, key="user_id", token=None, prefetch=0):
+    if prefetch > 0:
+        return _prefetch(page_size, keyset, key, token, prefetch)
+    return _pages(page_size, keyset, key, token)
@@ -1,20 +1,11 @@
-import mysql.connector
+from connection_pool import get_connection, open_cursor
 
 def stream_user_ages():
-    connection = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="ALX_prodev"
-    )
-    cursor = connection.cursor()
-    cursor.execute("SELECT age FROM user_data")
+    with get_connection() as connection, open_cursor(connection) as cursor:
+        cursor.execute("SELECT age FROM user_data")
 
-    for (age,) in cursor:
-        yield age
-
-    cursor.close()
-    connection.close()
+        for (age,) in cursor:
+            yield age
 
 def compute_average_age():
     total = 0
@@ -0,0 +1,53 @@
+import sys
+
+
+class AdaptiveBatchSize:
+    """Tune a fetchmany() size toward a latency target and/or byte budget.
+
+    After each fetch, record() compares the measured latency with
+    `target_latency` (seconds) and the estimated batch size in bytes with
+    `max_bytes`, and rescales the next size to meet the tighter of the two.
+    Changes are limited to halving or doubling per fetch and clamped to
+    [min_size, max_size]. `history` keeps (size, rows, seconds, bytes) for
+    every fetch so callers can see what was chosen.
+    """
+
+    def __init__(self, initial=1000, target_latency=0.05, max_bytes=None,
+                 min_size=10, max_size=100000):
+        self.size = initial
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self.max_size = max_size
+        self.history = []
+
+    def record(self, rows, seconds):
+        n = len(rows)
+        nbytes = n * _row_bytes(rows[0]) if n else 0
+        self.history.append((self.size, n, seconds, nbytes))
+        if n < self.size:
+            return  # A short fetch says nothing about the next one
+
+        candidates = []
+        if self.target_latency and seconds > 0:
+            candidates.append(self.size * self.target_latency / seconds)
+        if self.max_bytes and nbytes:
+            candidates.append(self.size * self.max_bytes / nbytes)
+        if not candidates:
+            return
+        wanted = min(candidates)
+        wanted = max(self.size / 2, min(self.size * 2, wanted))
+        self.size = int(max(self.min_size, min(self.max_size, wanted)))
+
+    def report(self):
+        sizes = [size for size, _, _, _ in self.history]
+        if not sizes:
+            return "no fetches"
+        return (f"{len(sizes)} fetches, batch size {sizes[0]} -> {self.size} "
+                f"(min {min(sizes)}, max {max(sizes)})")
+
+
+# Rough in-memory size of one row (dict or tuple) and its values
+def _row_bytes(row):
+    values = row.values() if isinstance(row, dict) else row
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
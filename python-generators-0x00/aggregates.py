@@ -0,0 +1,177 @@
+import math
+import random
+
+from connection_pool import get_backend, get_connection, open_cursor
+from predicates import quote_identifier
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to plain Python
+    np = None
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+# Push the aggregates to the database. The percentiles (nearest rank,
+# exact) come from one ROW_NUMBER() pass over the column in sorted order,
+# which sorts the table once since the column is not indexed.
+def sql_aggregates(column="age", table="user_data",
+                   percentiles=DEFAULT_PERCENTILES):
+    column, table = quote_identifier(column), quote_identifier(table)
+    with get_connection() as connection, open_cursor(connection) as cursor:
+        var_pop = get_backend().var_pop_sql(column, table)
+        cursor.execute(
+            f"SELECT COUNT({column}), SUM({column}), AVG({column}), "
+            f"MIN({column}), MAX({column}), {var_pop} FROM {table}"
+        )
+        count, total, mean, low, high, variance = cursor.fetchone()
+        result = {
+            "count": count,
+            "sum": _number(total),
+            "mean": _number(mean),
+            "min": _number(low),
+            "max": _number(high),
+            "variance": _number(variance),
+            "percentiles": {},
+        }
+        if count and percentiles:
+            ranks = {p: _rank(p, count) for p in percentiles}
+            wanted = sorted(set(ranks.values()))
+            placeholders = ", ".join(["%s"] * len(wanted))
+            cursor.execute(
+                f"SELECT position, value FROM ("
+                f"SELECT {column} AS value, "
+                f"ROW_NUMBER() OVER (ORDER BY {column}) - 1 AS position "
+                f"FROM {table} WHERE {column} IS NOT NULL) ranked "
+                f"WHERE position IN ({placeholders})",
+                tuple(wanted),
+            )
+            values = dict(cursor.fetchall())
+            result["percentiles"] = {
+                p: _number(values[rank]) for p, rank in ranks.items()
+            }
+    return result
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def _rank(p, count):
+    return min(count - 1, max(0, math.floor(p * (count - 1))))
+
+
+class StreamingStats:
+    """Single-pass count/sum/mean/min/max/variance over batches of numbers.
+
+    Each batch is reduced on its own (vectorised when numpy is available)
+    and merged with Chan et al.'s pairwise update, which stays numerically
+    stable where a running sum of squares would not. Percentiles are
+    approximated from a uniform reservoir sample of `sample_size` values.
+    """
+
+    def __init__(self, sample_size=10000, seed=None):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sample_size = sample_size
+        self.sample = []
+        self._random = random.Random(seed)
+        self._np_random = np.random.default_rng(seed) if np is not None else None
+
+    def update(self, batch):
+        if np is not None:
+            values = np.asarray(batch, dtype=np.float64)
+            n = int(values.size)
+            if not n:
+                return
+            total = float(values.sum())
+            mean = total / n
+            m2 = float(((values - mean) ** 2).sum())
+            low, high = float(values.min()), float(values.max())
+        else:
+            values = [float(v) for v in batch]
+            n = len(values)
+            if not n:
+                return
+            total = math.fsum(values)
+            mean = total / n
+            m2 = math.fsum((v - mean) ** 2 for v in values)
+            low, high = min(values), max(values)
+
+        delta = mean - self.mean
+        combined = self.count + n
+        self.mean += delta * n / combined
+        self.m2 += m2 + delta * delta * self.count * n / combined
+        self.sum += total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self._sample(values)
+        self.count = combined
+
+    def _sample(self, values):
+        # Reservoir sampling (Algorithm R), continuing from self.count
+        seen = self.count
+        fill = min(self.sample_size - len(self.sample), len(values))
+        if fill > 0:
+            self.sample.extend(float(v) for v in values[:fill])
+            seen += fill
+        rest = values[fill:] if fill > 0 else values
+        if np is not None:
+            # Draw every slot at once; only the few hits are assigned in Python
+            slots = self._np_random.integers(0, np.arange(seen, seen + len(rest)) + 1)
+            hits = slots < self.sample_size
+            for j, value in zip(slots[hits].tolist(), rest[hits].tolist()):
+                self.sample[j] = value
+            return
+        for value in rest:
+            j = self._random.randint(0, seen)
+            if j < self.sample_size:
+                self.sample[j] = value
+            seen += 1
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else None
+
+    def percentile(self, p):
+        if not self.sample:
+            return None
+        ordered = sorted(self.sample)
+        return ordered[_rank(p, len(ordered))]
+
+    def result(self, percentiles=DEFAULT_PERCENTILES):
+        return {
+            "count": self.count,
+            "sum": self.sum if self.count else None,
+            "mean": self.mean if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "variance": self.variance,
+            "percentiles": {p: self.percentile(p) for p in percentiles},
+        }
+
+
+# Stream one numeric column in batches of floats (numpy arrays if available)
+def stream_column_batches(column="age", table="user_data", batch_size=10000):
+    column, table = quote_identifier(column), quote_identifier(table)
+    with get_connection() as connection, \
+            open_cursor(connection, buffered=False) as cursor:
+        cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            values = [float(value) for (value,) in rows]
+            yield np.array(values) if np is not None else values
+
+
+def streaming_aggregates(column="age", table="user_data", batch_size=10000,
+                         percentiles=DEFAULT_PERCENTILES, sample_size=10000):
+    stats = StreamingStats(sample_size)
+    for batch in stream_column_batches(column, table, batch_size):
+        stats.update(batch)
+    return stats.result(percentiles)
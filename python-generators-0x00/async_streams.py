@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+stream_users = __import__('0-stream_users').stream_users
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+lazy_paginate = __import__('2-lazy_paginate').lazy_paginate
+
+
+def _take(gen, n):
+    items = []
+    for item in gen:
+        items.append(item)
+        if len(items) >= n:
+            break
+    return items
+
+
+# Drive a blocking generator from a worker thread, `chunk_size` items per
+# hop, so the event loop stays free while the driver waits on the network.
+# Each stream gets its own single thread: the generator is never resumed
+# concurrently, and closing it waits for any fetch still in flight.
+async def _offload(gen, chunk_size=1):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="astream")
+    try:
+        while True:
+            items = await loop.run_in_executor(executor, _take, gen, chunk_size)
+            if not items:
+                break
+            for item in items:
+                yield item
+    finally:
+        await loop.run_in_executor(executor, gen.close)
+        executor.shutdown(wait=False)
+
+
+# The wrappers return the _offload async generator itself, so aclose() on
+# the result closes the underlying generator and its connection directly.
+def astream_users(fetch_size=None, chunk_size=500):
+    return _offload(stream_users(fetch_size), chunk_size)
+
+
+def astream_users_in_batches(batch_size, **kwargs):
+    return _offload(stream_users_in_batches(batch_size, **kwargs))
+
+
+def alazy_paginate(page_size, **kwargs):
+    return _offload(lazy_paginate(page_size, **kwargs))
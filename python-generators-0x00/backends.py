@@ -0,0 +1,292 @@
+import functools
+import os
+import re
+import sqlite3
+import threading
+
+
+# MySQL connection settings, overridable through the environment
+def db_config():
+    return {
+        "host": os.environ.get("MYSQL_HOST", "localhost"),
+        "port": int(os.environ.get("MYSQL_PORT", "3306")),
+        "user": os.environ.get("MYSQL_USER", "root"),
+        "password": os.environ.get("MYSQL_PASSWORD", ""),
+        "database": os.environ.get("MYSQL_DATABASE", "ALX_prodev"),
+    }
+
+
+class MySQLBackend:
+    """mysql-connector backend (the default).
+
+    Fast paths: unbuffered cursors stream rows from the server, and
+    executemany() of an INSERT is rewritten by the driver into multi-row
+    statements.
+    """
+
+    name = "mysql"
+
+    def __init__(self, config=None):
+        import mysql.connector  # Only required when this backend is used
+
+        self._connector = mysql.connector
+        self.Error = mysql.connector.Error
+        self.config = config
+
+    def connect(self, database=True):
+        config = dict(self.config or db_config())
+        if not database:
+            config.pop("database", None)
+        return self._connector.connect(**config)
+
+    def cursor(self, connection, **kwargs):
+        return connection.cursor(**kwargs)
+
+    def is_healthy(self, connection):
+        return connection.is_connected()
+
+    def has_unread_result(self, connection):
+        return connection.unread_result
+
+    def in_transaction(self, connection):
+        return connection.in_transaction
+
+    def create_database(self, connection, name):
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+        cursor.close()
+
+    def create_user_table(self, connection):
+        cursor = connection.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_data (
+                user_id CHAR(36) PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL(3, 0) NOT NULL,
+                updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                    ON UPDATE CURRENT_TIMESTAMP(6),
+                UNIQUE INDEX email_unique (email),
+                INDEX updated_at_idx (updated_at, user_id)
+            )
+        """)
+        # Tables created before the bulk loader only had a plain INDEX(email)
+        cursor.execute(
+            "SHOW INDEX FROM user_data WHERE Column_name = 'email' AND Non_unique = 0"
+        )
+        if not cursor.fetchall():
+            cursor.execute(
+                "ALTER TABLE user_data ADD UNIQUE INDEX email_unique (email)"
+            )
+        # ...and no updated_at column for incremental syncs
+        cursor.execute("SHOW COLUMNS FROM user_data LIKE 'updated_at'")
+        if not cursor.fetchall():
+            cursor.execute("""
+                ALTER TABLE user_data
+                    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+                        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+                    ADD INDEX updated_at_idx (updated_at, user_id)
+            """)
+        cursor.close()
+
+    # INSERT for user rows; on a duplicate email either refresh name/age
+    # ("update") or keep the existing row ("ignore")
+    def insert_user_sql(self, on_duplicate="update"):
+        if on_duplicate == "update":
+            action = "name = VALUES(name), age = VALUES(age)"
+        else:
+            action = "email = email"
+        return f"""
+            INSERT INTO user_data (user_id, name, email, age)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE {action}
+        """
+
+    def var_pop_sql(self, column, table):
+        return f"VAR_POP({column})"
+
+    # `column` is older than %s seconds ago by the server's clock
+    def older_than_sql(self, column):
+        return f"{column} < NOW(6) - INTERVAL %s MICROSECOND"
+
+    def seconds_param(self, seconds):
+        return int(seconds * 1_000_000)
+
+
+# A quoted literal or identifier, a comment, or a %s placeholder
+_PLACEHOLDER = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|--[^\n]*|/\*.*?\*/|%s""",
+    re.DOTALL,
+)
+
+
+# Rewrite %s placeholders to ?, leaving %s inside literals (strftime('%s'),
+# LIKE '%s...') and comments alone
+@functools.lru_cache(maxsize=256)
+def _qmark(query):
+    return _PLACEHOLDER.sub(
+        lambda match: "?" if match.group() == "%s" else match.group(), query
+    )
+
+
+class _SQLiteCursor:
+    """sqlite3 cursor with the parts of the mysql-connector API we use.
+
+    Translates %s placeholders to ? (see _qmark), returns dict rows when
+    asked for dictionary=True and exposes column_names. sqlite3 cursors
+    already step through results lazily, so `buffered` is accepted and
+    ignored.
+    """
+
+    def __init__(self, connection, dictionary=False, buffered=None):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+        self.column_names = ()
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_qmark(query), params)
+        description = self._cursor.description or ()
+        self.column_names = tuple(column[0] for column in description)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(_qmark(query), seq_of_params)
+        return self
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _convert(self, rows):
+        if not self._dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchmany(self, size=1):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def __iter__(self):
+        if not self._dictionary:
+            return iter(self._cursor)
+        names = self.column_names
+        return (dict(zip(names, row)) for row in self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteBackend:
+    """sqlite3 backend for local runs, tests and benchmarks (no server).
+
+    Fast paths: executemany() runs one prepared statement for the whole
+    chunk, and WAL mode lets readers stream while a writer seeds.
+    """
+
+    name = "sqlite"
+    Error = sqlite3.Error
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("SQLITE_PATH", "ALX_prodev.db")
+
+    def connect(self, database=True):
+        # Pooled connections may be handed to other threads (prefetching)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def cursor(self, connection, **kwargs):
+        return _SQLiteCursor(connection, **kwargs)
+
+    def is_healthy(self, connection):
+        try:
+            connection.execute("SELECT 1")
+        except sqlite3.Error:
+            return False
+        return True
+
+    def has_unread_result(self, connection):
+        return False
+
+    def in_transaction(self, connection):
+        return connection.in_transaction
+
+    def create_database(self, connection, name):
+        pass  # The database is the file itself
+
+    def create_user_table(self, connection):
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS user_data (
+                user_id CHAR(36) PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL UNIQUE COLLATE NOCASE,
+                age DECIMAL(3, 0) NOT NULL,
+                updated_at TEXT NOT NULL
+                    DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            );
+            CREATE INDEX IF NOT EXISTS updated_at_idx
+                ON user_data (updated_at, user_id);
+            -- SQLite has no ON UPDATE CURRENT_TIMESTAMP
+            CREATE TRIGGER IF NOT EXISTS user_data_touch
+                AFTER UPDATE OF name, email, age ON user_data
+                BEGIN
+                    UPDATE user_data
+                    SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                    WHERE user_id = NEW.user_id;
+                END;
+        """)
+
+    def insert_user_sql(self, on_duplicate="update"):
+        if on_duplicate == "update":
+            # Only touch rows whose values change, like MySQL does
+            action = """DO UPDATE SET name = excluded.name, age = excluded.age
+                WHERE name <> excluded.name OR age <> excluded.age"""
+        else:
+            action = "DO NOTHING"
+        return f"""
+            INSERT INTO user_data (user_id, name, email, age)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT(email) {action}
+        """
+
+    # No VAR_POP; AVG(x*x) - AVG(x)^2 cancels badly (it can even go
+    # negative), so average the squared deviations from the mean instead
+    def var_pop_sql(self, column, table):
+        deviation = f"({column} - (SELECT AVG({column}) FROM {table}))"
+        return f"AVG({deviation} * {deviation})"
+
+    def older_than_sql(self, column):
+        return f"{column} < strftime('%Y-%m-%d %H:%M:%f', 'now', %s)"
+
+    def seconds_param(self, seconds):
+        return f"-{seconds} seconds"
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# The process-wide backend, chosen with ALX_DB_BACKEND (mysql or sqlite)
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BACKENDS[os.environ.get("ALX_DB_BACKEND", "mysql")]()
+        return _backend
+
+
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
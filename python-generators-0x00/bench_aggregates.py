@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Compare compute_average_age's loop with the SQL and streaming aggregates.
+
+Usage: python3 bench_aggregates.py
+Runs against the database configured through the MYSQL_* variables and
+fails if the three paths disagree.
+"""
+import math
+import time
+
+from aggregates import sql_aggregates, streaming_aggregates
+
+stream_user_ages = __import__('4-stream_ages').stream_user_ages
+
+
+def python_loop():
+    # The loop used by compute_average_age
+    total = 0
+    count = 0
+    for age in stream_user_ages():
+        total += age
+        count += 1
+    return {"count": count, "mean": float(total / count) if count else None}
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<12}{time.perf_counter() - start:>10.3f}s  "
+          f"count={result['count']} mean={result['mean']}")
+    return result
+
+
+if __name__ == "__main__":
+    loop = timed("loop", python_loop)
+    sql = timed("sql", sql_aggregates)
+    streamed = timed("streaming", streaming_aggregates)
+
+    for key in ("count", "mean"):
+        assert math.isclose(loop[key], sql[key]) or loop[key] == sql[key], key
+    for key in ("count", "sum", "mean", "min", "max", "variance"):
+        a, b = sql[key], streamed[key]
+        assert a == b or math.isclose(a, b, rel_tol=1e-9), (key, a, b)
+    print("sql percentiles:      ", sql["percentiles"])
+    print("streaming percentiles:", streamed["percentiles"])
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Consume several user streams sync (one after another) vs async (together).
+
+Usage: python3 bench_async_streams.py [streams] [batch_size]
+(defaults: 4 streams, batch size 1000). Runs against the database
+configured through the MYSQL_* variables; MYSQL_POOL_SIZE should be at
+least the number of streams.
+"""
+import asyncio
+import sys
+import time
+
+from async_streams import astream_users_in_batches
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+
+def run_sync(streams, batch_size):
+    rows = 0
+    for _ in range(streams):
+        for batch in stream_users_in_batches(batch_size):
+            rows += len(batch)
+    return rows
+
+
+async def consume(batch_size):
+    rows = 0
+    async for batch in astream_users_in_batches(batch_size):
+        rows += len(batch)
+    return rows
+
+
+async def run_async(streams, batch_size):
+    counts = await asyncio.gather(*(consume(batch_size) for _ in range(streams)))
+    return sum(counts)
+
+
+if __name__ == "__main__":
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    start = time.perf_counter()
+    rows = run_sync(streams, batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"sync : {rows:,} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)")
+
+    start = time.perf_counter()
+    rows = asyncio.run(run_async(streams, batch_size))
+    elapsed = time.perf_counter() - start
+    print(f"async: {rows:,} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)")
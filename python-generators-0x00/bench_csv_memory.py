@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Peak RSS of load_csv_data vs stream_csv_data on large synthetic CSVs.
+
+Usage: python3 bench_csv_memory.py [rows ...]   (default: 1000000 10000000)
+"""
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+seed = __import__('seed')
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline='') as csvfile:
+        writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
+        writer.writerow(["name", "email", "age"])
+        for i in range(rows):
+            writer.writerow([f"User {i}", f"User.{i}@example.com", i % 100])
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(mode, path):
+    start = time.perf_counter()
+    rows = 0
+    if mode == "list":
+        rows = len(seed.load_csv_data(path))
+    else:
+        for chunk in seed.stream_csv_data(path):
+            rows += len(chunk)
+    elapsed = time.perf_counter() - start
+    print(f"{mode:<7}{rows:>12,}{elapsed:>10.2f}s{peak_rss_mb():>12.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    sizes = [int(n) for n in sys.argv[1:]] or [1_000_000, 10_000_000]
+    print(f"{'mode':<7}{'rows':>12}{'time':>11}{'peak RSS':>15}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "users.csv")
+            write_csv(path, size)
+            # Each mode runs in its own process so ru_maxrss is not shared
+            for mode in ("list", "stream"):
+                subprocess.run(
+                    [sys.executable, __file__, "--run", mode, path], check=True
+                )
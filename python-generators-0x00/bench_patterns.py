@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Benchmark the python-generators-0x00 access patterns.
+
+Usage: python3 bench_patterns.py [--backend mysql|sqlite]
+                                 [--sizes 10000,100000] [--json results.json]
+
+For every size a scratch database (BENCH_MYSQL_DATABASE, default
+ALX_prodev_bench, or BENCH_SQLITE_PATH, default a temporary file) is
+emptied and seeded with synthetic users; MYSQL_DATABASE and SQLITE_PATH
+are ignored so the configured database is never touched.
+
+Each pattern then runs in its own process and reports rows/sec,
+time-to-first-row and peak RSS. On MySQL it also reports the statements
+and connections the server saw (read from SHOW GLOBAL STATUS, so run it
+against an otherwise idle server). The results are printed as a table
+and written as JSON for tracking regressions over time.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+PATTERNS = {
+    "stream_users":
+        lambda: __import__('0-stream_users').stream_users(),
+    "stream_users_fetch":
+        lambda: __import__('0-stream_users').stream_users(fetch_size=1000),
+    "stream_users_in_batches":
+        lambda: __import__('1-batch_processing').stream_users_in_batches(1000),
+    "lazy_paginate_offset":
+        lambda: __import__('2-lazy_paginate').lazy_paginate(1000),
+    "lazy_paginate_keyset":
+        lambda: __import__('2-lazy_paginate').lazy_paginate(1000, keyset=True),
+    "stream_user_ages":
+        lambda: __import__('4-stream_ages').stream_user_ages(),
+}
+
+
+def _count(item):
+    # Batch and page patterns yield lists of rows
+    return len(item) if isinstance(item, list) else 1
+
+
+def run_pattern(name):
+    items = PATTERNS[name]()
+    start = time.perf_counter()
+    first = None
+    rows = 0
+    for item in items:
+        if first is None:
+            first = time.perf_counter() - start
+        rows += _count(item)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else None,
+        "time_to_first_row": first,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def server_counters():
+    from backends import get_backend
+
+    if get_backend().name != "mysql":
+        return None  # No server, no round-trips to count
+    connection = get_backend().connect()
+    cursor = connection.cursor()
+    cursor.execute(
+        "SHOW GLOBAL STATUS WHERE Variable_name IN ('Questions', 'Connections')"
+    )
+    counters = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    connection.close()
+    return counters
+
+
+def seed_database(rows):
+    import seed
+    from backends import get_backend
+    from bench_csv_memory import write_csv
+
+    server = seed.connect_db()
+    seed.create_database(server)
+    server.close()
+    connection = seed.connect_to_prodev()
+    seed.create_table(connection)
+    cursor = get_backend().cursor(connection)
+    cursor.execute("DELETE FROM user_data")
+    cursor.close()
+    connection.commit()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.csv")
+        write_csv(path, rows)
+        seed.bulk_insert_data(connection, seed.stream_csv_data(path))
+    connection.close()
+
+
+def measure(name, env):
+    before = server_counters()
+    output = subprocess.run(
+        [sys.executable, __file__, "--run", name],
+        check=True, capture_output=True, text=True, env=env,
+    ).stdout
+    after = server_counters()
+    result = json.loads(output.strip().splitlines()[-1])
+    result["statements"] = result["connections"] = None
+    if before is not None:
+        # The counter query itself is one statement and one connection
+        result["statements"] = after["Questions"] - before["Questions"] - 1
+        result["connections"] = after["Connections"] - before["Connections"] - 1
+    return result
+
+
+def _cell(value):
+    return "-" if value is None else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("mysql", "sqlite"),
+                        default=os.environ.get("ALX_DB_BACKEND", "mysql"))
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--patterns", default=",".join(PATTERNS))
+    parser.add_argument("--json", default="bench_patterns.json")
+    args = parser.parse_args()
+
+    os.environ["ALX_DB_BACKEND"] = args.backend
+    # seed_database() empties user_data, so never run on the real database
+    production = os.environ.get("MYSQL_DATABASE", "ALX_prodev")
+    bench_database = os.environ.get("BENCH_MYSQL_DATABASE", "ALX_prodev_bench")
+    if bench_database.lower() in {production.lower(), "alx_prodev"}:
+        parser.error(f"refusing to benchmark on {bench_database}: "
+                     "set BENCH_MYSQL_DATABASE to a scratch database")
+    os.environ["MYSQL_DATABASE"] = bench_database
+    scratch = tempfile.TemporaryDirectory()
+    production = os.environ.get("SQLITE_PATH", "ALX_prodev.db")
+    bench_path = os.environ.get("BENCH_SQLITE_PATH",
+                                os.path.join(scratch.name, "bench.db"))
+    if os.path.realpath(bench_path) in {os.path.realpath(production),
+                                        os.path.realpath("ALX_prodev.db")}:
+        parser.error(f"refusing to benchmark on {bench_path}: "
+                     "set BENCH_SQLITE_PATH to a scratch file")
+    os.environ["SQLITE_PATH"] = bench_path
+    env = dict(os.environ)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "database": env["MYSQL_DATABASE" if args.backend == "mysql" else "SQLITE_PATH"],
+        "results": [],
+    }
+
+    print(f"{'size':>10} {'pattern':<26}{'rows/sec':>12}{'first row':>12}"
+          f"{'peak RSS':>12}{'stmts':>8}{'conns':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        seed_database(size)
+        for name in args.patterns.split(","):
+            result = measure(name, env)
+            result.update(size=size, pattern=name)
+            report["results"].append(result)
+            print(f"{size:>10} {name:<26}{result['rows_per_sec'] or 0:>12,.0f}"
+                  f"{(result['time_to_first_row'] or 0) * 1000:>10.1f}ms"
+                  f"{result['peak_rss_kb'] / 1024:>9.1f} MB"
+                  f"{_cell(result['statements']):>8}{_cell(result['connections']):>7}")
+
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.json}")
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--run":
+        run_pattern(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Per-row allocation and iteration cost of dict rows vs UserRow.
+
+Usage: python3 bench_row_factory.py [rows]   (default: 100000)
+Builds rows from synthetic driver tuples, so no database is needed.
+"""
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from rows import UserRow
+
+NAMES = UserRow.COLUMNS
+
+
+def make_tuples(n):
+    now = datetime.now()
+    return [
+        (str(uuid.uuid4()), f"User Number {i}", f"user.{i}@example.com",
+         Decimal(i % 100), now)
+        for i in range(n)
+    ]
+
+
+FACTORIES = {
+    "dict": lambda values: dict(zip(NAMES, values)),
+    "UserRow": lambda values: UserRow(*values),
+}
+
+READERS = {
+    "dict": lambda row: row["age"] > 25 and row["email"],
+    "UserRow": lambda row: row.age > 25 and row.email,
+}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tuples = make_tuples(n)
+    print(f"{'format':<10}{'bytes/row':>12}{'build ns/row':>15}{'read ns/row':>14}")
+    for name, factory in FACTORIES.items():
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        rows = [factory(values) for values in tuples]
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        rows = [factory(values) for values in tuples]
+        build = time.perf_counter() - start
+
+        read = READERS[name]
+        start = time.perf_counter()
+        for row in rows:
+            read(row)
+        iterate = time.perf_counter() - start
+        print(f"{name:<10}{allocated / n:>12.1f}{build / n * 1e9:>15.0f}"
+              f"{iterate / n * 1e9:>14.0f}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Time-to-first-row and peak RSS of stream_users, buffered vs streaming.
+
+Usage: python3 bench_stream_users.py [fetch_size]   (default: 1000)
+Runs against the database configured through the MYSQL_* variables.
+"""
+import resource
+import subprocess
+import sys
+import time
+
+from connection_pool import get_connection, open_cursor
+
+stream_users = __import__('0-stream_users').stream_users
+
+
+def buffered_users():
+    # Baseline: the whole result set is read before the first row is yielded
+    with get_connection() as connection, \
+            open_cursor(connection, dictionary=True, buffered=True) as cursor:
+        cursor.execute("SELECT * FROM user_data")
+        yield from cursor
+
+
+def run(mode, fetch_size):
+    if mode == "buffered":
+        rows = buffered_users()
+    elif mode == "default":
+        rows = stream_users()
+    else:
+        rows = stream_users(fetch_size=fetch_size)
+
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in rows:
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10}{count:>12,}{(first or 0) * 1000:>12.1f}ms"
+          f"{total:>10.2f}s{rss:>12.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+
+    fetch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{'mode':<10}{'rows':>12}{'first row':>14}{'total':>11}{'peak RSS':>15}")
+    # One process per mode so ru_maxrss is not shared between them
+    for mode in ("buffered", "default", "streaming"):
+        subprocess.run(
+            [sys.executable, __file__, "--run", mode, str(fetch_size)], check=True
+        )
@@ -0,0 +1,126 @@
+from array import array
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; arrays work without it
+    np = None
+
+
+class StringColumn:
+    """Strings packed into one UTF-8 buffer plus an array of end offsets.
+
+    Storage is one bytes object and 8 bytes per value instead of one str
+    object (about 50 bytes of header each) per value.
+    """
+
+    def __init__(self, values=()):
+        data = bytearray()
+        offsets = array('Q')
+        for value in values:
+            data += value.encode('utf-8')
+            offsets.append(len(data))
+        self.data = bytes(data)
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.offsets)
+        start = self.offsets[index - 1] if index else 0
+        return self.data[start:self.offsets[index]].decode('utf-8')
+
+    def __iter__(self):
+        start = 0
+        for end in self.offsets:
+            yield self.data[start:end].decode('utf-8')
+            start = end
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+    def take(self, indices):
+        return StringColumn(self[i] for i in indices)
+
+
+# Typed array for a column, chosen from its first non-NULL value
+def _make_column(values):
+    sample = next((v for v in values if v is not None), None)
+    if any(v is None for v in values):
+        return list(values)
+    if isinstance(sample, bool):
+        return list(values)
+    if isinstance(sample, int) or (
+        isinstance(sample, Decimal) and all(v == v.to_integral_value() for v in values)
+    ):
+        return array('q', (int(v) for v in values))
+    if isinstance(sample, (float, Decimal)):
+        return array('d', (float(v) for v in values))
+    if isinstance(sample, str):
+        return StringColumn(values)
+    return list(values)
+
+
+class ColumnarBatch:
+    """A batch of rows stored column by column.
+
+    Numeric columns are array.array (int64/float64), string columns are
+    StringColumn, anything else (or columns containing NULL) stays a list.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns  # name -> column, all of equal length
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        return cls({
+            name: _make_column([row[i] for row in rows])
+            for i, name in enumerate(names)
+        })
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def to_numpy(self, name):
+        column = self.columns[name]
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        if isinstance(column, array):
+            # Zero-copy view over the array buffer
+            return np.frombuffer(column, dtype=column.typecode)
+        return np.array(list(column), dtype=object)
+
+    def filter(self, mask):
+        indices = [i for i, keep in enumerate(mask) if keep]
+        columns = {}
+        for name, column in self.columns.items():
+            if isinstance(column, StringColumn):
+                columns[name] = column.take(indices)
+            elif isinstance(column, array):
+                columns[name] = array(column.typecode, (column[i] for i in indices))
+            else:
+                columns[name] = [column[i] for i in indices]
+        return ColumnarBatch(columns)
+
+    def rows(self):
+        names = list(self.columns)
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+    @property
+    def nbytes(self):
+        total = 0
+        for column in self.columns.values():
+            if isinstance(column, StringColumn):
+                total += column.nbytes
+            elif isinstance(column, array):
+                total += column.itemsize * len(column)
+            else:
+                total += 8 * len(column)
+        return total
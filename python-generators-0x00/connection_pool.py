@@ -0,0 +1,162 @@
+import atexit
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from backends import get_backend
+
+
+class ConnectionPool:
+    """A small thread-safe pool of database connections.
+
+    size:            maximum number of open connections
+    idle_timeout:    connections idle for longer than this are reopened
+    health_check:    connections idle for longer than this are pinged
+                     before being handed out (0 pings on every checkout)
+    """
+
+    def __init__(self, size=5, idle_timeout=300, health_check=30, backend=None):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.backend = backend or get_backend()
+        self._idle = []  # (connection, last_used), most recent last
+        self._open = 0
+        self._cond = threading.Condition()
+        self.created = 0
+        self.reused = 0
+
+    def _connect(self):
+        self.created += 1
+        return self.backend.connect()
+
+    def _usable(self, connection, idle_for):
+        if idle_for > self.idle_timeout:
+            return False
+        if idle_for >= self.health_check:
+            return self.backend.is_healthy(connection)
+        return True
+
+    def acquire(self):
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                self._cond.wait()
+            if self._idle:
+                connection, last_used = self._idle.pop()
+            else:
+                connection, last_used = None, None
+            self._open += 1
+
+        try:
+            if connection is not None:
+                if self._usable(connection, time.monotonic() - last_used):
+                    self.reused += 1
+                    return connection
+                self._close_quietly(connection)
+            return self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection, discard=False):
+        # A connection with an unread result set cannot be reused without
+        # draining it, which may mean pulling millions of rows; drop it.
+        if not discard and self.backend.has_unread_result(connection):
+            discard = True
+        if not discard and self.backend.in_transaction(connection):
+            try:
+                connection.rollback()
+            except self.backend.Error:
+                discard = True
+        if discard:
+            self._close_quietly(connection)
+        with self._cond:
+            self._open -= 1
+            if not discard:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except self.backend.Error:
+            pass
+
+
+_open_cursors = weakref.WeakSet()
+
+
+# Cursor that is closed when the block exits, including on GeneratorExit
+# when a consumer abandons a generator mid-stream. Closing an unbuffered
+# cursor with rows still pending raises "Unread result found"; that error
+# is swallowed here and the pool then discards the connection on release.
+@contextmanager
+def open_cursor(connection, **kwargs):
+    backend = get_backend()
+    cursor = backend.cursor(connection, **kwargs)
+    _open_cursors.add(cursor)
+    try:
+        yield cursor
+    finally:
+        _open_cursors.discard(cursor)
+        try:
+            cursor.close()
+        except backend.Error:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# The process-wide pool shared by all generator functions
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                size=int(os.environ.get("MYSQL_POOL_SIZE", "5")),
+                idle_timeout=float(os.environ.get("MYSQL_POOL_IDLE_TIMEOUT", "300")),
+                health_check=float(os.environ.get("MYSQL_POOL_HEALTH_CHECK", "30")),
+            )
+        return _pool
+
+
+def get_connection():
+    return get_pool().connection()
+
+
+# Leak detector: at exit, report connections still checked out of the pool
+# and cursors that were never closed, then close the idle connections.
+def report_leaks(stream=None):
+    stream = stream or sys.stderr
+    checked_out = _pool._open if _pool is not None else 0
+    cursors = len(_open_cursors)
+    if checked_out or cursors:
+        print(f"connection_pool: {checked_out} connection(s) still checked "
+              f"out, {cursors} cursor(s) still open at exit", file=stream)
+    if _pool is not None:
+        _pool.close_all()
+    return checked_out, cursors
+
+
+atexit.register(report_leaks)
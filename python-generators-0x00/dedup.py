@@ -0,0 +1,145 @@
+import hashlib
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from connection_pool import open_cursor
+
+ALREADY_IN_DATABASE = "already in database"
+DUPLICATE_IN_CSV = "duplicate in CSV"
+POSSIBLE_DUPLICATE = "possible duplicate"
+
+
+# 64-bit digest of a lowercased email: 8 bytes instead of a str, and the
+# chance of any collision among 5M emails is under one in a million
+def email_digest(email):
+    digest = hashlib.blake2b(email.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class _SortedDigests:
+    """Read-only set of email digests in a sorted array('q'), 8 bytes each."""
+
+    def __init__(self, digests):
+        self._digests = array("q", sorted(digests))
+
+    def __contains__(self, digest):
+        i = bisect_left(self._digests, digest)
+        return i < len(self._digests) and self._digests[i] == digest
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class DedupIndex:
+    """In-process duplicate detection for seeding, O(1) per row.
+
+    Existing emails are loaded once with load_existing(); every email that
+    passes through check() is remembered, which also catches duplicates
+    within the CSV. With exact=True the index holds 64-bit digests of the
+    emails (see email_digest) rather than the strings: existing ones in a
+    sorted array, 8 bytes each, and those seen in the CSV in a set. check()
+    then returns the reason a row should be skipped. With exact=False a
+    Bloom filter is used: a hit may be a false positive, so check() reports
+    it as a possible duplicate and the row is still written, leaving the
+    final decision to the email_unique index rather than dropping a new user.
+    """
+
+    def __init__(self, exact=True, capacity=1_000_000, error_rate=0.001):
+        self.exact = exact
+        if exact:
+            self._existing, self._seen = _SortedDigests(()), set()
+        else:
+            self._existing = BloomFilter(capacity, error_rate)
+            self._seen = BloomFilter(capacity, error_rate)
+        self.counts = Counter()
+
+    def _key(self, email):
+        email = email.lower()
+        return email_digest(email) if self.exact else email
+
+    def load_existing(self, connection, fetch_size=10000):
+        digests = array("q")
+        with open_cursor(connection, buffered=False) as cursor:
+            cursor.execute("SELECT email FROM user_data")
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                for (email,) in rows:
+                    if self.exact:
+                        digests.append(self._key(email))
+                    else:
+                        self._existing.add(self._key(email))
+        if self.exact:
+            self._existing = _SortedDigests(digests)
+        return self
+
+    # Returns None for a new email, otherwise why it may be a duplicate
+    def check(self, email):
+        key = self._key(email)
+        if key in self._existing:
+            reason = ALREADY_IN_DATABASE if self.exact else POSSIBLE_DUPLICATE
+        elif key in self._seen:
+            reason = DUPLICATE_IN_CSV if self.exact else POSSIBLE_DUPLICATE
+        else:
+            reason = None
+            self._seen.add(key)
+        if reason is not None:
+            self.counts[reason] += 1
+        return reason
+
+    # Drop rows that are known duplicates; possible ones are kept
+    def filter(self, rows):
+        return [
+            row for row in rows
+            if self.check(row[1]) in (None, POSSIBLE_DUPLICATE)
+        ]
+
+    def report(self):
+        skipped = self.counts[ALREADY_IN_DATABASE] + self.counts[DUPLICATE_IN_CSV]
+        lines = [f"Skipped {skipped} duplicate rows"]
+        for reason in (ALREADY_IN_DATABASE, DUPLICATE_IN_CSV):
+            if self.counts[reason]:
+                lines.append(f"  {reason}: {self.counts[reason]}")
+        if self.counts[POSSIBLE_DUPLICATE]:
+            lines.append(f"  {POSSIBLE_DUPLICATE} (Bloom filter hit, left to "
+                         f"the unique index): {self.counts[POSSIBLE_DUPLICATE]}")
+        return "\n".join(lines)
+
+
+# Exact digests for tables up to `bloom_threshold` rows (about 40 MB at the
+# threshold), Bloom filter beyond
+def build_index(connection, bloom_threshold=5_000_000, error_rate=0.001):
+    with open_cursor(connection) as cursor:
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        (existing,) = cursor.fetchone()
+    exact = existing <= bloom_threshold
+    index = DedupIndex(exact, capacity=2 * existing + 1_000_000,
+                       error_rate=error_rate)
+    return index.load_existing(connection)
@@ -0,0 +1,114 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+from predicates import col
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+EXPORT_COLUMNS = ("user_id", "name", "email", "age", "updated_at")
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+# user_id is a random UUID, so its leading hex digits spread rows evenly;
+# shard i covers [bounds[i], bounds[i + 1]) with open ends at both sides.
+def shard_bounds(shards):
+    cuts = [format(i * 0x10000 // shards, "04x") for i in range(1, shards)]
+    return list(zip([None] + cuts, cuts + [None]))
+
+
+def _shard_predicate(low, high):
+    predicate = None
+    if low is not None:
+        predicate = col("user_id") >= low
+    if high is not None:
+        upper = col("user_id") < high
+        predicate = upper if predicate is None else predicate & upper
+    return predicate
+
+
+# Stream one key range of user_data to `path`; only one batch is in memory
+def export_users(path, fmt="csv", compress=False, batch_size=5000,
+                 low=None, high=None):
+    rows = 0
+    where = _shard_predicate(low, high)
+    with _open_output(path, compress) as out:
+        if fmt == "csv":
+            writer = csv.writer(out)
+            writer.writerow(EXPORT_COLUMNS)
+        for batch in stream_users_in_batches(batch_size, columns=EXPORT_COLUMNS,
+                                             where=where):
+            if fmt == "csv":
+                writer.writerows(
+                    [_plain(row[name]) for name in EXPORT_COLUMNS] for row in batch
+                )
+            else:
+                out.writelines(
+                    json.dumps({name: _plain(row[name]) for name in EXPORT_COLUMNS})
+                    + "\n"
+                    for row in batch
+                )
+            rows += len(batch)
+    return rows
+
+
+# users.csv.gz -> users.part003.csv.gz
+def shard_path(path, shard):
+    directory, name = os.path.split(path)
+    stem, dot, extension = name.partition(".")
+    return os.path.join(directory, f"{stem}.part{shard:03d}{dot}{extension}")
+
+
+def export_sharded(path, shards, fmt="csv", compress=False, batch_size=5000):
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        futures = {
+            shard_path(path, i): pool.submit(
+                export_users, shard_path(path, i), fmt, compress, batch_size,
+                low, high,
+            )
+            for i, (low, high) in enumerate(shard_bounds(shards))
+        }
+        return {part: future.result() for part, future in futures.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export ALX_prodev.user_data")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--gzip", action="store_true",
+                        help="gzip-compress the output")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="export key ranges in parallel to N files")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.shards > 1:
+        parts = export_sharded(args.output, args.shards, args.format,
+                               args.gzip, args.batch_size)
+        for part, rows in parts.items():
+            print(f"{part}: {rows} rows")
+        total = sum(parts.values())
+    else:
+        total = export_users(args.output, args.format, args.gzip, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {total} rows in {elapsed:.2f}s")
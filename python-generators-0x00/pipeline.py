@@ -0,0 +1,57 @@
+import os
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+
+
+def parallel_map(func, batches, workers=None, processes=False, ordered=True,
+                 max_in_flight=None):
+    """Apply `func` to every batch on a thread or process pool.
+
+    At most `max_in_flight` batches (default 2 * workers) are submitted
+    ahead of the consumer, so a fast batch generator cannot run away from a
+    slow pool. With ordered=True results come back in input order,
+    otherwise as soon as each finishes. The first exception raised by
+    `func` is re-raised to the consumer and pending batches are cancelled.
+    On an error or early stop the batch source is closed too, so a
+    generator holding a connection gives it back straight away.
+    With processes=True, `func` and the batches must be picklable (use
+    dict or columnar batches, not ones holding cursors).
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    batches = iter(batches)
+    pending = deque() if ordered else set()
+
+    def submit():
+        for batch in batches:
+            future = executor.submit(func, batch)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+            return True
+        return False
+
+    executor = executor_class(max_workers=workers)
+    try:
+        while len(pending) < max_in_flight and submit():
+            pass
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending.difference_update(done)
+            for future in done:
+                yield future.result()
+                submit()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        close = getattr(batches, "close", None)
+        if close is not None:
+            close()
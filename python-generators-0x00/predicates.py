@@ -0,0 +1,236 @@
+import operator
+import re
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def quote_identifier(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return f"`{name}`"
+
+
+# None means "any column"
+def _merge_columns(left, right):
+    if left is None or right is None:
+        return None
+    return left + right
+
+
+class Predicate:
+    """A row filter that can be compiled into SQL where possible.
+
+    Predicates compose with `&`, `|` and `~`. `sql()` returns a fragment
+    with %s placeholders and its parameters, or None when the predicate can
+    only be evaluated in Python. Calling a predicate on a row dict always
+    evaluates it in Python.
+    """
+
+    columns = ()
+
+    def sql(self):
+        return None
+
+    def __call__(self, row):
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Comparison(Predicate):
+    _SQL = {
+        operator.eq: "=", operator.ne: "<>",
+        operator.lt: "<", operator.le: "<=",
+        operator.gt: ">", operator.ge: ">=",
+    }
+
+    def __init__(self, column, op, value):
+        self.column = column
+        self.op = op
+        self.value = value
+        self.columns = (column,)
+
+    def sql(self):
+        if self.value is None:
+            if self.op is operator.eq:
+                return f"{quote_identifier(self.column)} IS NULL", ()
+            if self.op is operator.ne:
+                return f"{quote_identifier(self.column)} IS NOT NULL", ()
+        column = quote_identifier(self.column)
+        return f"{column} {self._SQL[self.op]} %s", (self.value,)
+
+    def __call__(self, row):
+        value = row[self.column]
+        if self.value is None:
+            return self.op(value, None)
+        # NULL compares false in SQL; do the same here
+        return value is not None and self.op(value, self.value)
+
+
+class In(Predicate):
+    def __init__(self, column, values):
+        self.column = column
+        self.values = tuple(values)
+        self.columns = (column,)
+
+    def sql(self):
+        if not self.values:
+            return "1 = 0", ()
+        marks = ", ".join(["%s"] * len(self.values))
+        return f"{quote_identifier(self.column)} IN ({marks})", self.values
+
+    def __call__(self, row):
+        return row[self.column] in self.values
+
+
+class And(Predicate):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.columns = _merge_columns(left.columns, right.columns)
+
+    def sql(self):
+        left, right = self.left.sql(), self.right.sql()
+        if left is None or right is None:
+            return None
+        return f"({left[0]} AND {right[0]})", left[1] + right[1]
+
+    def __call__(self, row):
+        return self.left(row) and self.right(row)
+
+
+class Or(Predicate):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.columns = _merge_columns(left.columns, right.columns)
+
+    def sql(self):
+        left, right = self.left.sql(), self.right.sql()
+        if left is None or right is None:
+            return None
+        return f"({left[0]} OR {right[0]})", left[1] + right[1]
+
+    def __call__(self, row):
+        return self.left(row) or self.right(row)
+
+
+class Not(Predicate):
+    def __init__(self, inner):
+        self.inner = inner
+        self.columns = inner.columns
+
+    def sql(self):
+        inner = self.inner.sql()
+        if inner is None:
+            return None
+        return f"NOT ({inner[0]})", inner[1]
+
+    def __call__(self, row):
+        return not self.inner(row)
+
+
+class PythonPredicate(Predicate):
+    """An arbitrary Python test on the row; never pushed down.
+
+    `columns` names the fields the function reads so they can be fetched
+    even when a narrower projection was requested.
+    """
+
+    def __init__(self, func, columns=None):
+        self.func = func
+        self.columns = tuple(columns) if columns is not None else None
+
+    def __call__(self, row):
+        return self.func(row)
+
+
+class Column:
+    def __init__(self, name):
+        quote_identifier(name)
+        self.name = name
+
+    def __eq__(self, value):
+        return Comparison(self.name, operator.eq, value)
+
+    def __ne__(self, value):
+        return Comparison(self.name, operator.ne, value)
+
+    def __lt__(self, value):
+        return Comparison(self.name, operator.lt, value)
+
+    def __le__(self, value):
+        return Comparison(self.name, operator.le, value)
+
+    def __gt__(self, value):
+        return Comparison(self.name, operator.gt, value)
+
+    def __ge__(self, value):
+        return Comparison(self.name, operator.ge, value)
+
+    def isin(self, values):
+        return In(self.name, values)
+
+    def between(self, low, high):
+        return (self >= low) & (self <= high)
+
+    __hash__ = None
+
+
+col = Column
+
+
+def where(func, columns=None):
+    return PythonPredicate(func, columns)
+
+
+# Split a predicate into top-level AND terms
+def _conjuncts(predicate):
+    if isinstance(predicate, And):
+        return _conjuncts(predicate.left) + _conjuncts(predicate.right)
+    return [predicate]
+
+
+def build_select(table, columns=None, predicate=None):
+    """Compile a projection and a predicate into one SELECT.
+
+    Returns (query, params, residual, project): `residual` is the part of
+    the predicate left for Python (or None) and `project` is the column
+    list rows must be trimmed to after filtering (or None when the SELECT
+    already returns exactly `columns`).
+    """
+    pushed, params, residual = [], (), None
+    for term in _conjuncts(predicate) if predicate is not None else []:
+        compiled = term.sql()
+        if compiled is None:
+            residual = term if residual is None else residual & term
+        else:
+            pushed.append(compiled[0])
+            params += tuple(compiled[1])
+
+    project = None
+    if columns is None:
+        select = "*"
+    elif residual is not None and residual.columns is None:
+        # The Python predicate may read any column
+        select = "*"
+        project = tuple(columns)
+    else:
+        fetched = list(columns)
+        for name in residual.columns if residual is not None else ():
+            if name not in fetched:
+                fetched.append(name)
+                project = tuple(columns)
+        select = ", ".join(quote_identifier(name) for name in fetched)
+
+    query = f"SELECT {select} FROM {quote_identifier(table)}"
+    if pushed:
+        query += " WHERE " + " AND ".join(pushed)
+    return query, params, residual, project
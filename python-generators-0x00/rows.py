@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+
+class UserRow:
+    """One user_data row as a slotted object with typed fields.
+
+    No per-row __dict__ and no repeated key strings: just five references.
+    COLUMNS is the SELECT list the generators use when this class is passed
+    as their row_factory; values arrive positionally in that order.
+    """
+
+    __slots__ = ("user_id", "name", "email", "age", "updated_at")
+    COLUMNS = __slots__
+
+    def __init__(self, user_id, name, email, age, updated_at=None):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        # DECIMAL(3, 0) arrives as Decimal; keep ages as plain ints
+        self.age = int(age) if isinstance(age, Decimal) else age
+        self.updated_at = updated_at
+
+    # Lets predicates and code written for dict rows read fields by name
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRow):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"UserRow({fields})"
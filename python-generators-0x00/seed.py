@@ -1,61 +1,51 @@
-import mysql.connector
+from backends import db_config, get_backend
+from dedup import POSSIBLE_DUPLICATE, build_index, email_digest
+import argparse
 import csv
+import heapq
+import os
+import time
 import uuid
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+BULK_CHUNK_SIZE = 5000
 
 # Prototype: Connect to MySQL server (without DB)
 def connect_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password=""
-    )
+    return get_backend().connect(database=False)
 
 # Prototype: Create the ALX_prodev database if it doesn't exist
 def create_database(connection):
-    cursor = connection.cursor()
-    cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
-    cursor.close()
+    get_backend().create_database(connection, db_config()['database'])
 
 # Prototype: Connect to the ALX_prodev database
 def connect_to_prodev():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="ALX_prodev"
-    )
-
-# Prototype: Create the user_data table
+    return get_backend().connect()
+
+# Prototype: Create the user_data table (DDL per backend, see backends.py)
 def create_table(connection):
-    cursor = connection.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_data (
-            user_id CHAR(36) PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            email VARCHAR(255) NOT NULL,
-            age DECIMAL(3, 0) NOT NULL,
-            INDEX(email)
-        )
-    """)
-    cursor.close()
+    get_backend().create_user_table(connection)
 
 # Prototype: Insert data into the user_data table
-def insert_data(connection, data):
-    cursor = connection.cursor()
+# Duplicates are found in an in-process index (see dedup.py) instead of a
+# SELECT per row; Bloom filter hits fall back to the email_unique index.
+def insert_data(connection, data, dedup=None):
+    if dedup is None:
+        dedup = build_index(connection)
+    cursor = get_backend().cursor(connection)
+    query = get_backend().insert_user_sql(on_duplicate="ignore")
     for row in data:
         name, email, age = row
-        # Check if email already exists
-        cursor.execute("SELECT * FROM user_data WHERE email = %s", (email,))
-        if cursor.fetchone():
-            print(f"Skipping duplicate email: {email}")
+        reason = dedup.check(email)
+        if reason is not None and reason != POSSIBLE_DUPLICATE:
+            print(f"Skipping duplicate email ({reason}): {email}")
             continue
         user_id = str(uuid.uuid4())
-        cursor.execute("""
-            INSERT INTO user_data (user_id, name, email, age)
-            VALUES (%s, %s, %s, %s)
-        """, (user_id, name, email, age))
+        cursor.execute(query, (user_id, name, email, age))
     connection.commit()
     cursor.close()
+    print(dedup.report())
 
 # Load data from CSV
 def load_csv_data(filepath):
@@ -64,8 +54,200 @@ def load_csv_data(filepath):
         next(reader)  # Skip header
         return [row for row in reader]
 
+# Validate a raw CSV row and convert it to (name, email, age)
+def parse_row(row):
+    if len(row) != 3:
+        raise ValueError(f"expected 3 fields, got {len(row)}")
+    name, email, age = row
+    name = name.strip()
+    email = email.strip().lower()
+    if not name:
+        raise ValueError("empty name")
+    if "@" not in email:
+        raise ValueError(f"invalid email {email!r}")
+    age = int(age)
+    if not 0 <= age <= 999:  # age is DECIMAL(3, 0)
+        raise ValueError(f"age out of range: {age}")
+    return name, email, age
+
+# Group validated rows from a csv.reader into fixed-size chunks. `where`
+# describes the current row's position for error messages.
+def _chunk_rows(reader, chunk_size, where=None):
+    chunk = []
+    for row in reader:
+        try:
+            chunk.append(parse_row(row))
+        except ValueError as err:
+            position = where() if where else f"row {reader.line_num}"
+            print(f"Skipping invalid {position}: {err}")
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Stream validated rows from the CSV in fixed-size chunks. Only one chunk is
+# held at a time and the next one is read only when the writer asks for it,
+# so memory stays flat regardless of file size.
+def stream_csv_data(filepath, chunk_size=BULK_CHUNK_SIZE):
+    with open(filepath, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)  # Skip header
+        yield from _chunk_rows(reader, chunk_size)
+
+# Split the CSV body (after the header) into n byte ranges
+def split_byte_ranges(filepath, n):
+    with open(filepath, 'rb') as f:
+        f.readline()  # Skip header
+        body_start = f.tell()
+    size = os.path.getsize(filepath)
+    step = max(1, (size - body_start) // n)
+    bounds = [body_start + i * step for i in range(n)] + [size]
+    return [(bounds[i], bounds[i + 1]) for i in range(n)]
+
+# Yield the decoded lines that start inside [start, end). A line cut by
+# `start` belongs to the previous range. Byte ranges assume no quoted field
+# spans several lines, which holds for user_data.csv. If given, offset[0]
+# is kept at the file offset of the line last yielded.
+def _read_byte_range(filepath, start, end, offset=None):
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()  # Finish the line owned by the previous range
+        while f.tell() < end:
+            if offset is not None:
+                offset[0] = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+# Stream validated chunks for a single byte range of the CSV
+# Line numbers are unknown inside a range, so rows are located by offset.
+def stream_csv_range(filepath, start, end, chunk_size=BULK_CHUNK_SIZE):
+    offset = [start]
+    reader = csv.reader(_read_byte_range(filepath, start, end, offset))
+    yield from _chunk_rows(reader, chunk_size,
+                           lambda: f"row at byte {offset[0]}")
+
+# Bulk, idempotent insert: one multi-row statement and one commit per chunk.
+# Duplicate emails are resolved by the email_unique index instead of a
+# SELECT per row, so re-running the seed keeps the original user_id and
+# refreshes name/age from the last occurrence in the CSV.
+# With a DedupIndex the load is insert-only instead: known duplicates are
+# dropped before they are sent, the rest are sent with "ignore" so existing
+# rows are never changed, and the first occurrence in the CSV wins.
+def bulk_insert_data(connection, chunks, label=None, dedup=None):
+    cursor = get_backend().cursor(connection)
+    on_duplicate = "update" if dedup is None else "ignore"
+    query = get_backend().insert_user_sql(on_duplicate=on_duplicate)
+    total = 0
+    start = time.perf_counter()
+    try:
+        for chunk in chunks:
+            if dedup is not None:
+                chunk = dedup.filter(chunk)
+                if not chunk:
+                    continue
+            cursor.executemany(query, [
+                (str(uuid.uuid4()), name, email, age)
+                for name, email, age in chunk
+            ])
+            connection.commit()
+            total += len(chunk)
+            if label:
+                print(f"[{label}] {total} rows committed")
+    finally:
+        cursor.close()
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    prefix = f"[{label}] " if label else ""
+    print(f"{prefix}Seeded {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    if dedup is not None:
+        print(dedup.report())
+    return total
+
+def count_rows(connection):
+    cursor = get_backend().cursor(connection)
+    cursor.execute("SELECT COUNT(*), COUNT(DISTINCT email) FROM user_data")
+    total, distinct = cursor.fetchone()
+    cursor.close()
+    return total, distinct
+
+# Worker entry point: seed one byte range over its own connection. Returns
+# the rows sent and the sorted hashes of their emails.
+def seed_shard(filepath, start, end, worker, chunk_size=BULK_CHUNK_SIZE):
+    hashes = array('q')
+
+    def chunks():
+        for chunk in stream_csv_range(filepath, start, end, chunk_size):
+            hashes.extend(email_digest(email) for _, email, _ in chunk)
+            yield chunk
+
+    connection = connect_to_prodev()
+    try:
+        sent = bulk_insert_data(connection, chunks(), label=f"worker {worker}")
+    finally:
+        connection.close()
+    return sent, array('q', sorted(hashes))
+
+# Number of distinct values across sorted arrays, merged without a set
+def _count_distinct(sorted_arrays):
+    count, last = 0, None
+    for value in heapq.merge(*sorted_arrays):
+        if value != last:
+            count += 1
+            last = value
+    return count
+
+# Seed the CSV over `workers` connections from a process pool, then check
+# the table against the distinct emails sent: every one of them must be
+# stored, and there can be no more new rows than there are of them.
+def parallel_seed(connection, filepath, workers, chunk_size=BULK_CHUNK_SIZE):
+    before, _ = count_rows(connection)
+    start = time.perf_counter()
+    ranges = split_byte_ranges(filepath, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(seed_shard, filepath, lo, hi, i, chunk_size)
+            for i, (lo, hi) in enumerate(ranges)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    sent = sum(count for count, _ in results)
+    distinct_sent = _count_distinct([hashes for _, hashes in results])
+
+    # Autocommit is off, so end the snapshot taken by the first count
+    connection.commit()
+    after, _ = count_rows(connection)
+    rate = sent / elapsed if elapsed > 0 else 0.0
+    print(f"Seeded {sent} rows ({distinct_sent} distinct emails) with "
+          f"{workers} workers in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    print(f"user_data rows: {before} before, {after} after")
+    if after < distinct_sent or after - before > distinct_sent:
+        raise RuntimeError(
+            f"Inconsistent row count: {after} rows ({after - before} new) "
+            f"after sending {distinct_sent} distinct emails"
+        )
+    return sent
+
 # Main logic
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed ALX_prodev.user_data")
+    parser.add_argument("csv", nargs="?", default="user_data.csv")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of parallel connections")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="insert new emails only; leave existing rows "
+                             "unchanged instead of updating name/age")
+    args = parser.parse_args()
+    if args.skip_existing and args.workers > 1:
+        parser.error("--skip-existing needs one worker: the index is per process")
+
     try:
         # Step 1: Connect to server and create DB
         server_conn = connect_db()
@@ -76,15 +258,19 @@ if __name__ == "__main__":
         db_conn = connect_to_prodev()
         create_table(db_conn)
 
-        # Step 3: Load data and insert
-        data = load_csv_data("user_data.csv")
-        insert_data(db_conn, data)
+        # Step 3: Stream data and bulk insert
+        if args.workers > 1:
+            parallel_seed(db_conn, args.csv, args.workers, args.chunk_size)
+        else:
+            dedup = build_index(db_conn) if args.skip_existing else None
+            bulk_insert_data(db_conn, stream_csv_data(args.csv, args.chunk_size),
+                             dedup=dedup)
 
         print("Database seeded successfully.")
 
-    except mysql.connector.Error as err:
-        print("MySQL Error:", err)
+    except get_backend().Error as err:
+        print("Database Error:", err)
 
     finally:
-        if 'db_conn' in locals() and db_conn.is_connected():
+        if 'db_conn' in locals():
             db_conn.close()
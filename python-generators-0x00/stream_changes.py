@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import datetime
+
+from backends import get_backend
+from connection_pool import get_connection, open_cursor
+
+WATERMARK_PATH = os.environ.get("USER_DATA_WATERMARK", ".user_data.watermark")
+
+# updated_at is set when a statement runs, not when its transaction
+# commits, so a slow writer can commit rows stamped behind a saved
+# watermark. Rows newer than this many seconds are left for the next sync;
+# it must exceed the longest write transaction on user_data.
+COMMIT_LAG = float(os.environ.get("USER_DATA_COMMIT_LAG", "10"))
+
+
+# The watermark is the (updated_at, user_id) of the last row a consumer has
+# finished with; user_id breaks ties between rows sharing a timestamp.
+def load_watermark(path=WATERMARK_PATH):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data["updated_at"], data["user_id"]
+
+
+def save_watermark(watermark, path=WATERMARK_PATH):
+    updated_at, user_id = watermark
+    if isinstance(updated_at, datetime):
+        updated_at = updated_at.isoformat(sep=" ", timespec="microseconds")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"updated_at": updated_at, "user_id": user_id}, f)
+    os.replace(tmp, path)  # Atomic, so a crash never leaves half a file
+
+
+def _changes_after(watermark, batch_size, lag):
+    backend = get_backend()
+    settled = backend.older_than_sql("updated_at")
+    lag = backend.seconds_param(lag)
+    with get_connection() as connection, \
+            open_cursor(connection, dictionary=True) as cursor:
+        if watermark is None:
+            cursor.execute(
+                f"SELECT * FROM user_data WHERE {settled} "
+                "ORDER BY updated_at, user_id LIMIT %s",
+                (lag, batch_size),
+            )
+        else:
+            updated_at, user_id = watermark
+            cursor.execute(
+                f"SELECT * FROM user_data WHERE {settled} AND "
+                "(updated_at > %s OR (updated_at = %s AND user_id > %s)) "
+                "ORDER BY updated_at, user_id LIMIT %s",
+                (lag, updated_at, updated_at, user_id, batch_size),
+            )
+        return cursor.fetchall()
+
+
+# Yield batches of rows inserted or updated since the stored watermark,
+# up to `lag` seconds ago (see COMMIT_LAG).
+# The watermark for a batch is saved when the consumer asks for the next
+# one, i.e. once it has finished with the batch, so an interrupted sync
+# redelivers at most the batch it was working on.
+def stream_changes(batch_size=1000, watermark_path=WATERMARK_PATH,
+                   lag=COMMIT_LAG):
+    watermark = load_watermark(watermark_path)
+    while True:
+        batch = _changes_after(watermark, batch_size, lag)
+        if not batch:
+            break
+        yield batch
+        watermark = (batch[-1]["updated_at"], batch[-1]["user_id"])
+        save_watermark(watermark, watermark_path)
+        if len(batch) < batch_size:
+            break
+
+
+if __name__ == "__main__":
+    total = 0
+    for batch in stream_changes():
+        total += len(batch)
+    print(f"{total} changed rows since the last sync")
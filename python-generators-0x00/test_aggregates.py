@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Integration tests for the SQL and streaming aggregates on SQLite.
+"""
+
+import math
+import os
+import sqlite3
+import statistics
+import tempfile
+import unittest
+
+import backends
+import connection_pool
+from aggregates import StreamingStats, _rank, sql_aggregates, streaming_aggregates
+from backends import SQLiteBackend
+
+
+class TestAggregates(unittest.TestCase):
+    """
+    Test sql_aggregates and streaming_aggregates against Python's results.
+    """
+
+    def setUp(self) -> None:
+        """
+        Point the process-wide backend and pool at a SQLite file of values.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.tmp.name, "test.db"))
+        self.previous = backends._backend
+        backends.set_backend(self.backend)
+        connection_pool._pool = None
+        self.values = [(i * 37) % 101 for i in range(500)]
+        self.fill("CREATE TABLE data (value REAL)", self.values)
+
+    def tearDown(self) -> None:
+        """
+        Close pooled connections and restore the previous backend.
+        """
+        connection_pool.get_pool().close_all()
+        connection_pool._pool = None
+        backends.set_backend(self.previous)
+        self.tmp.cleanup()
+
+    def fill(self, ddl, values):
+        connection = sqlite3.connect(self.backend.path)
+        connection.execute("DROP TABLE IF EXISTS data")
+        connection.execute(ddl)
+        connection.executemany("INSERT INTO data VALUES (?)",
+                               [(value,) for value in values])
+        connection.commit()
+        connection.close()
+
+    def test_sql_matches_python(self) -> None:
+        """
+        Test the SQL moments and exact percentiles match Python's.
+        """
+        result = sql_aggregates("value", "data", percentiles=(0, 0.5, 0.9, 1))
+        self.assertEqual(result["count"], len(self.values))
+        self.assertEqual(result["sum"], sum(self.values))
+        self.assertAlmostEqual(result["mean"], statistics.fmean(self.values))
+        self.assertAlmostEqual(result["variance"], statistics.pvariance(self.values))
+        ordered = sorted(self.values)
+        self.assertEqual(result["percentiles"], {
+            p: ordered[_rank(p, len(ordered))] for p in (0, 0.5, 0.9, 1)
+        })
+
+    def test_sql_variance_of_large_values(self) -> None:
+        """
+        Test the variance keeps its precision for values far from zero.
+        """
+        values = [1e9 + i % 3 for i in range(1000)]
+        self.fill("CREATE TABLE data (value REAL)", values)
+        result = sql_aggregates("value", "data", percentiles=())
+        self.assertAlmostEqual(result["variance"], statistics.pvariance(values),
+                               places=6)
+
+    def test_sql_skips_nulls(self) -> None:
+        """
+        Test NULLs are left out of the count and the percentile ranks.
+        """
+        self.fill("CREATE TABLE data (value REAL)", [None, 3, None, 1, 2])
+        result = sql_aggregates("value", "data", percentiles=(0, 0.5, 1))
+        self.assertEqual(result["count"], 3)
+        self.assertEqual(result["percentiles"], {0: 1.0, 0.5: 2.0, 1: 3.0})
+
+    def test_streaming_matches_sql(self) -> None:
+        """
+        Test the streamed moments agree with the SQL ones.
+        """
+        sql = sql_aggregates("value", "data")
+        streamed = streaming_aggregates("value", "data", batch_size=64)
+        for name in ("count", "sum", "mean", "min", "max", "variance"):
+            with self.subTest(name=name):
+                self.assertAlmostEqual(streamed[name], sql[name])
+
+
+class TestStreamingStats(unittest.TestCase):
+    """
+    Test merging batch moments in StreamingStats.
+    """
+
+    def test_uneven_batches(self) -> None:
+        """
+        Test batches of any size merge into the moments of the whole.
+        """
+        values = [math.sin(i) * 1e6 + 1e9 for i in range(1000)]
+        stats = StreamingStats(seed=1)
+        for start, end in ((0, 1), (1, 400), (400, 400), (400, 1000)):
+            stats.update(values[start:end])
+        self.assertEqual(stats.count, len(values))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(values), places=3)
+        self.assertAlmostEqual(
+            stats.variance / statistics.pvariance(values), 1.0, places=9
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
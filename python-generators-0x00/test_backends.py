@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite backend's mysql-connector compatibility layer.
+"""
+
+import sqlite3
+import unittest
+
+from backends import SQLiteBackend, _qmark
+
+
+class TestPlaceholders(unittest.TestCase):
+    """
+    Test %s placeholders are translated to ? outside literals only.
+    """
+
+    def test_translation(self) -> None:
+        """
+        Test placeholders are rewritten and quoted or commented %s is kept.
+        """
+        cases = {
+            "SELECT * FROM t WHERE a = %s AND b IN (%s, %s)":
+                "SELECT * FROM t WHERE a = ? AND b IN (?, ?)",
+            "SELECT strftime('%s', 'now'), %s":
+                "SELECT strftime('%s', 'now'), ?",
+            "SELECT * FROM t WHERE name LIKE '%s''s %' AND id = %s":
+                "SELECT * FROM t WHERE name LIKE '%s''s %' AND id = ?",
+            'SELECT "a%s" FROM `b%s` WHERE c = %s':
+                'SELECT "a%s" FROM `b%s` WHERE c = ?',
+            "SELECT %s -- not %s\n/* nor %s */":
+                "SELECT ? -- not %s\n/* nor %s */",
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(_qmark(query), expected)
+
+    def test_literal_percent_s_on_sqlite(self) -> None:
+        """
+        Test a %s inside a literal reaches SQLite unchanged.
+        """
+        backend = SQLiteBackend(":memory:")
+        connection = sqlite3.connect(":memory:")
+        cursor = backend.cursor(connection, dictionary=True)
+        cursor.execute("SELECT '%s' AS literal, %s AS param", (7,))
+        self.assertEqual(cursor.fetchone(), {"literal": "%s", "param": 7})
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the duplicate-email index in the dedup module.
+"""
+
+import os
+import tempfile
+import unittest
+
+import backends
+from backends import SQLiteBackend
+from dedup import (
+    ALREADY_IN_DATABASE, DUPLICATE_IN_CSV, POSSIBLE_DUPLICATE, BloomFilter,
+    DedupIndex, build_index, email_digest,
+)
+
+
+class TestBloomFilter(unittest.TestCase):
+    """
+    Test the Bloom filter has no false negatives and few false positives.
+    """
+
+    def test_membership(self) -> None:
+        """
+        Test every added value is found and most others are not.
+        """
+        bloom = BloomFilter(10_000, error_rate=0.01)
+        for i in range(10_000):
+            bloom.add(f"user{i}@example.com")
+        self.assertTrue(all(f"user{i}@example.com" in bloom for i in range(10_000)))
+        false_positives = sum(
+            f"other{i}@example.com" in bloom for i in range(10_000)
+        )
+        self.assertLess(false_positives, 300)
+
+
+class TestDedupIndex(unittest.TestCase):
+    """
+    Test duplicate detection against the table and within the CSV.
+    """
+
+    def setUp(self) -> None:
+        """
+        Point the process-wide backend at a SQLite table with one user.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = backends._backend
+        backends.set_backend(SQLiteBackend(os.path.join(self.tmp.name, "test.db")))
+        self.connection = backends.get_backend().connect()
+        backends.get_backend().create_user_table(self.connection)
+        self.connection.execute(
+            "INSERT INTO user_data (user_id, name, email, age) "
+            "VALUES ('a', 'Ann', 'Ann@X.com', 20)"
+        )
+        self.connection.commit()
+
+    def tearDown(self) -> None:
+        """
+        Close the connection and restore the previous backend.
+        """
+        self.connection.close()
+        backends.set_backend(self.previous)
+        self.tmp.cleanup()
+
+    def test_exact_reasons(self) -> None:
+        """
+        Test the exact index says why each duplicate is skipped.
+        """
+        index = build_index(self.connection)
+        self.assertTrue(index.exact)
+        self.assertEqual(index.check("ann@x.com"), ALREADY_IN_DATABASE)
+        self.assertIsNone(index.check("bob@x.com"))
+        self.assertEqual(index.check("BOB@x.com"), DUPLICATE_IN_CSV)
+        self.assertIn("Skipped 2 duplicate rows", index.report())
+
+    def test_bloom_hits_are_only_possible(self) -> None:
+        """
+        Test Bloom filter hits are reported but the rows are kept.
+        """
+        index = build_index(self.connection, bloom_threshold=0)
+        self.assertFalse(index.exact)
+        rows = [("Ann", "ann@x.com", 20), ("Bob", "bob@x.com", 30),
+                ("Bob", "bob@x.com", 31)]
+        self.assertEqual(index.filter(rows), rows)
+        self.assertEqual(index.counts[POSSIBLE_DUPLICATE], 2)
+
+    def test_filter_drops_known_duplicates(self) -> None:
+        """
+        Test filter keeps the first occurrence of each new email only.
+        """
+        index = DedupIndex().load_existing(self.connection)
+        rows = [("Ann", "ann@x.com", 20), ("Bob", "bob@x.com", 30),
+                ("Bob", "bob@x.com", 31), ("Cid", "cid@x.com", 40)]
+        self.assertEqual(index.filter(rows), [rows[1], rows[3]])
+
+    def test_exact_index_holds_digests(self) -> None:
+        """
+        Test the exact index keeps 64-bit digests instead of the emails.
+        """
+        index = build_index(self.connection)
+        index.check("bob@x.com")
+        self.assertEqual(index._existing._digests.typecode, "q")
+        self.assertEqual(index._seen, {email_digest("bob@x.com")})
+
+
+if __name__ == "__main__":
+    unittest.main()
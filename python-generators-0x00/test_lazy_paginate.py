@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Integration tests for keyset pagination in 2-lazy_paginate on SQLite.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+import backends
+import connection_pool
+from backends import SQLiteBackend
+
+lazy_paginate_module = __import__('2-lazy_paginate')
+lazy_paginate = lazy_paginate_module.lazy_paginate
+decode_token = lazy_paginate_module.decode_token
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """
+    Test lazy_paginate(keyset=True) against a SQLite user_data table.
+    """
+
+    def setUp(self) -> None:
+        """
+        Point the process-wide backend and pool at a seeded SQLite file.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.tmp.name, "test.db"))
+        self.previous = backends._backend
+        backends.set_backend(self.backend)
+        connection_pool._pool = None
+        connection = self.backend.connect()
+        self.backend.create_user_table(connection)
+        # Few distinct ages, so pages end in the middle of a run of ties
+        self.rows = [
+            (f"{i:04d}-id", f"User {i}", f"user{i}@example.com", i % 7)
+            for i in range(250)
+        ]
+        connection.executemany(
+            "INSERT INTO user_data (user_id, name, email, age) "
+            "VALUES (?, ?, ?, ?)",
+            self.rows,
+        )
+        connection.commit()
+        connection.close()
+
+    def tearDown(self) -> None:
+        """
+        Close pooled connections and restore the previous backend.
+        """
+        connection_pool.get_pool().close_all()
+        connection_pool._pool = None
+        backends.set_backend(self.previous)
+        self.tmp.cleanup()
+
+    def _user_ids(self, pages):
+        return [row["user_id"] for page in pages for row in page]
+
+    def test_unique_key_returns_every_row(self) -> None:
+        """
+        Test paging on user_id returns all rows in order.
+        """
+        ids = self._user_ids(lazy_paginate(30, keyset=True))
+        self.assertEqual(ids, sorted(row[0] for row in self.rows))
+
+    def test_non_unique_key_returns_every_row(self) -> None:
+        """
+        Test paging on a repeated column neither skips nor repeats rows.
+        """
+        for page_size in (1, 7, 36, 100):
+            with self.subTest(page_size=page_size):
+                pages = list(lazy_paginate(page_size, keyset=True, key="age"))
+                ids = self._user_ids(pages)
+                self.assertEqual(len(ids), len(self.rows))
+                self.assertEqual(set(ids), {row[0] for row in self.rows})
+                ages = [row["age"] for page in pages for row in page]
+                self.assertEqual(ages, sorted(ages))
+
+    def test_token_resumes_scan(self) -> None:
+        """
+        Test a page's next_token resumes right after that page.
+        """
+        pages = lazy_paginate(40, keyset=True, key="age")
+        first = next(pages)
+        pages.close()
+        self.assertEqual(decode_token(first.next_token)[0], "age")
+        rest = self._user_ids(
+            lazy_paginate(40, keyset=True, key="age", token=first.next_token)
+        )
+        ids = self._user_ids([first]) + rest
+        self.assertEqual(len(ids), len(self.rows))
+        self.assertEqual(set(ids), {row[0] for row in self.rows})
+
+    def test_token_for_other_key_is_rejected(self) -> None:
+        """
+        Test a token cannot silently change the key being paged on.
+        """
+        pages = lazy_paginate(40, keyset=True, key="age")
+        token = next(pages).next_token
+        pages.close()
+        with self.assertRaises(ValueError):
+            next(lazy_paginate(40, keyset=True, key="user_id", token=token))
+
+
+    def test_rejects_invalid_key(self) -> None:
+        """
+        Test the key column is validated before it is put in the query.
+        """
+        with self.assertRaises(ValueError):
+            next(lazy_paginate(10, keyset=True, key="age; DROP TABLE user_data"))
+
+
+    def test_prefetch_returns_same_rows(self) -> None:
+        """
+        Test prefetching pages on a thread yields the same rows.
+        """
+        expected = self._user_ids(lazy_paginate(30, keyset=True, key="age"))
+        prefetched = self._user_ids(
+            lazy_paginate(30, keyset=True, key="age", prefetch=2)
+        )
+        self.assertEqual(prefetched, expected)
+
+    def test_prefetch_early_stop_returns_connection(self) -> None:
+        """
+        Test abandoning a prefetching scan frees its pooled connection.
+        """
+        pages = lazy_paginate(10, prefetch=1)
+        next(pages)
+        pages.close()
+        pool = connection_pool.get_pool()
+        for _ in range(100):
+            if not pool._open:
+                break
+            time.sleep(0.01)
+        self.assertEqual(pool._open, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
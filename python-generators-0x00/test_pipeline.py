@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the parallel_map stage in the pipeline module.
+"""
+
+import threading
+import time
+import unittest
+
+from pipeline import parallel_map
+
+
+def _square(batch):
+    return [value * value for value in batch]
+
+
+class TestParallelMap(unittest.TestCase):
+    """
+    Test ordering, backpressure and cleanup of parallel_map.
+    """
+
+    def source(self, count):
+        self.closed = False
+        self.produced = 0
+        try:
+            for i in range(count):
+                self.produced += 1
+                yield [i]
+        finally:
+            self.closed = True
+
+    def test_ordered_results(self) -> None:
+        """
+        Test results come back in input order whatever the finishing order.
+        """
+        def slow_first(batch):
+            time.sleep(0.05 if batch[0] == 0 else 0)
+            return _square(batch)
+
+        results = list(parallel_map(slow_first, self.source(10), workers=4))
+        self.assertEqual(results, [[i * i] for i in range(10)])
+
+    def test_unordered_returns_everything(self) -> None:
+        """
+        Test ordered=False yields every result once.
+        """
+        results = parallel_map(_square, self.source(10), workers=4, ordered=False)
+        self.assertEqual(sorted(results), [[i * i] for i in range(10)])
+
+    def test_bounds_batches_in_flight(self) -> None:
+        """
+        Test no more than max_in_flight batches are read ahead.
+        """
+        results = parallel_map(_square, self.source(100), workers=2,
+                               max_in_flight=3)
+        next(results)
+        self.assertLessEqual(self.produced, 4)
+        results.close()
+
+    def test_early_stop_closes_source(self) -> None:
+        """
+        Test abandoning the results closes the batch generator.
+        """
+        source = self.source(100)  # Held, so only an explicit close() ends it
+        results = parallel_map(_square, source, workers=2)
+        next(results)
+        results.close()
+        self.assertTrue(self.closed)
+
+    def test_error_closes_source(self) -> None:
+        """
+        Test an exception in func reaches the consumer and closes the source.
+        """
+        calls = []
+        lock = threading.Lock()
+
+        def fail_on_three(batch):
+            with lock:
+                calls.append(batch[0])
+            if batch[0] == 3:
+                raise RuntimeError("boom")
+            return batch
+
+        source = self.source(100)
+        with self.assertRaises(RuntimeError):
+            list(parallel_map(fail_on_three, source, workers=2))
+        self.assertTrue(self.closed)
+        self.assertLess(len(calls), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
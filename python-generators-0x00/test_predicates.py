@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit tests for predicate pushdown in the predicates module.
+"""
+
+import sqlite3
+import unittest
+
+from backends import SQLiteBackend
+from predicates import build_select, col, where
+
+ROWS = [
+    ("a", "Ann", "ann@x.com", 20),
+    ("b", "Bob", "bob@x.com", 30),
+    ("c", "Cid", "cid@x.com", 40),
+    ("d", "Dee", "dee@x.com", 50),
+]
+
+
+class TestBuildSelect(unittest.TestCase):
+    """
+    Test how build_select splits a predicate between SQL and Python.
+    """
+
+    def test_pushes_comparisons_down(self) -> None:
+        """
+        Test that SQL-compilable terms become one parameterised WHERE.
+        """
+        query, params, residual, project = build_select(
+            "user_data", None, (col("age") > 25) & col("name").isin(["Bob", "Cid"])
+        )
+        self.assertEqual(
+            query,
+            "SELECT * FROM `user_data` WHERE `age` > %s AND `name` IN (%s, %s)",
+        )
+        self.assertEqual(params, (25, "Bob", "Cid"))
+        self.assertIsNone(residual)
+        self.assertIsNone(project)
+
+    def test_none_compiles_to_is_null(self) -> None:
+        """
+        Test that comparing with None uses IS [NOT] NULL.
+        """
+        self.assertEqual((col("age") == None).sql(), ("`age` IS NULL", ()))  # noqa: E711
+        self.assertEqual((col("age") != None).sql(), ("`age` IS NOT NULL", ()))  # noqa: E711
+
+    def test_python_terms_stay_residual(self) -> None:
+        """
+        Test that Python predicates are left for the caller to evaluate.
+        """
+        round_age = where(lambda row: row["age"] % 20 == 0, columns=["age"])
+        query, params, residual, project = build_select(
+            "user_data", ["name"], (col("age") >= 30) & round_age
+        )
+        self.assertEqual(
+            query, "SELECT `name`, `age` FROM `user_data` WHERE `age` >= %s"
+        )
+        self.assertEqual(params, (30,))
+        self.assertIs(residual, round_age)
+        self.assertEqual(project, ("name",))
+
+    def test_python_predicate_without_columns_fetches_all(self) -> None:
+        """
+        Test that a Python predicate of unknown columns selects every column.
+        """
+        query, _, residual, project = build_select(
+            "user_data", ["name"], where(lambda row: True)
+        )
+        self.assertEqual(query, "SELECT * FROM `user_data`")
+        self.assertIsNotNone(residual)
+        self.assertEqual(project, ("name",))
+
+    def test_or_with_python_term_is_not_pushed(self) -> None:
+        """
+        Test that an OR containing a Python term is evaluated in Python.
+        """
+        predicate = (col("age") < 25) | where(lambda row: row["name"] == "Dee")
+        query, params, residual, _ = build_select("user_data", None, predicate)
+        self.assertEqual(query, "SELECT * FROM `user_data`")
+        self.assertIs(residual, predicate)
+
+    def test_rejects_invalid_identifiers(self) -> None:
+        """
+        Test that column names are validated before being quoted.
+        """
+        with self.assertRaises(ValueError):
+            col("age; DROP TABLE user_data")
+
+
+class TestBuildSelectOnSQLite(unittest.TestCase):
+    """
+    Test that pushed-down SQL and Python evaluation select the same rows.
+    """
+
+    def setUp(self) -> None:
+        """
+        Create an in-memory user_data table.
+        """
+        self.backend = SQLiteBackend(":memory:")
+        self.connection = sqlite3.connect(":memory:")
+        self.backend.create_user_table(self.connection)
+        self.connection.executemany(
+            "INSERT INTO user_data (user_id, name, email, age) "
+            "VALUES (?, ?, ?, ?)",
+            ROWS,
+        )
+
+    def tearDown(self) -> None:
+        """
+        Close the connection.
+        """
+        self.connection.close()
+
+    def test_sql_matches_python(self) -> None:
+        """
+        Test each predicate returns the same rows in SQL and in Python.
+        """
+        predicates = [
+            col("age") > 25,
+            (col("age") > 25) & (col("age") < 45),
+            (col("name") == "Ann") | (col("age") >= 50),
+            ~col("name").isin(["Bob", "Dee"]),
+            col("age").between(30, 40),
+            col("name").isin([]),
+        ]
+        for predicate in predicates:
+            with self.subTest(sql=predicate.sql()):
+                query, params, residual, _ = build_select(
+                    "user_data", ["user_id", "name", "age"], predicate
+                )
+                self.assertIsNone(residual)
+                cursor = self.backend.cursor(self.connection, dictionary=True)
+                cursor.execute(query + " ORDER BY user_id", params)
+                from_sql = [row["user_id"] for row in cursor.fetchall()]
+                cursor.close()
+                rows = [
+                    dict(zip(("user_id", "name", "email", "age"), row))
+                    for row in ROWS
+                ]
+                in_python = [row["user_id"] for row in rows if predicate(row)]
+                self.assertEqual(from_sql, in_python)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Unit tests for CSV parsing, byte-range sharding and bulk loading in the
+seed module.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import backends
+from backends import SQLiteBackend
+from dedup import DedupIndex
+from seed import (
+    _count_distinct, _read_byte_range, bulk_insert_data, count_rows, parse_row,
+    split_byte_ranges, stream_csv_data, stream_csv_range,
+)
+
+
+class SQLiteTestCase(unittest.TestCase):
+    """
+    Base class pointing the process-wide backend at an empty SQLite file.
+    """
+
+    def setUp(self) -> None:
+        """
+        Create user_data in a temporary database file.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = backends._backend
+        backends.set_backend(SQLiteBackend(os.path.join(self.tmp.name, "test.db")))
+        self.connection = backends.get_backend().connect()
+        backends.get_backend().create_user_table(self.connection)
+
+    def tearDown(self) -> None:
+        """
+        Close the connection and restore the previous backend.
+        """
+        self.connection.close()
+        backends.set_backend(self.previous)
+        self.tmp.cleanup()
+
+    def load(self, chunks, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return bulk_insert_data(self.connection, chunks, **kwargs)
+
+    def users(self):
+        return dict(
+            (email, (user_id, name, age))
+            for user_id, name, email, age in self.connection.execute(
+                "SELECT user_id, name, email, age FROM user_data"
+            )
+        )
+
+
+class TestBulkInsert(SQLiteTestCase):
+    """
+    Test the chunked bulk upsert into user_data.
+    """
+
+    def test_inserts_every_chunk(self) -> None:
+        """
+        Test rows from all chunks are stored and counted.
+        """
+        chunks = [[("Ann", "ann@x.com", 20), ("Bob", "bob@x.com", 30)],
+                  [("Cid", "cid@x.com", 40)]]
+        self.assertEqual(self.load(chunks), 3)
+        self.assertEqual(count_rows(self.connection), (3, 3))
+
+    def test_rerun_updates_in_place(self) -> None:
+        """
+        Test reseeding keeps each user_id and refreshes name and age.
+        """
+        self.load([[("Ann", "ann@x.com", 20)]])
+        user_id = self.users()["ann@x.com"][0]
+        self.load([[("Annie", "ann@x.com", 21)]])
+        self.assertEqual(self.users(), {"ann@x.com": (user_id, "Annie", 21)})
+
+    def test_last_duplicate_in_csv_wins(self) -> None:
+        """
+        Test a repeated email within the CSV leaves a single row.
+        """
+        self.load([[("Ann", "ann@x.com", 20)], [("Ann", "ann@x.com", 25)]])
+        self.assertEqual(count_rows(self.connection), (1, 1))
+        self.assertEqual(self.users()["ann@x.com"][1:], ("Ann", 25))
+
+
+class TestSkipExisting(SQLiteTestCase):
+    """
+    Test loading with a DedupIndex (--skip-existing) against the upsert.
+    """
+
+    def test_default_updates_existing_rows(self) -> None:
+        """
+        Test the default load still refreshes the rows of known emails.
+        """
+        self.load([[("Ann", "ann@x.com", 20)]])
+        self.load([[("Annie", "ann@x.com", 21), ("Bob", "bob@x.com", 30)]])
+        self.assertEqual(self.users()["ann@x.com"][1:], ("Annie", 21))
+
+    def test_skip_existing_keeps_rows(self) -> None:
+        """
+        Test known emails are left unchanged and new ones are inserted.
+        """
+        self.load([[("Ann", "ann@x.com", 20)]])
+        before = self.users()
+        dedup = DedupIndex().load_existing(self.connection)
+        sent = self.load([[("Annie", "ann@x.com", 21), ("Bob", "bob@x.com", 30)]],
+                         dedup=dedup)
+        self.assertEqual(sent, 1)
+        users = self.users()
+        self.assertEqual(users["ann@x.com"], before["ann@x.com"])
+        self.assertEqual(users["bob@x.com"][1:], ("Bob", 30))
+
+    def test_skip_existing_first_duplicate_in_csv_wins(self) -> None:
+        """
+        Test a repeated email within the CSV keeps its first occurrence.
+        """
+        dedup = DedupIndex().load_existing(self.connection)
+        self.load([[("Ann", "ann@x.com", 20)], [("Ann", "ann@x.com", 25)]],
+                  dedup=dedup)
+        self.assertEqual(self.users()["ann@x.com"][1:], ("Ann", 20))
+
+class TestParseRow(unittest.TestCase):
+    """
+    Test validation and typing of raw CSV rows.
+    """
+
+    def test_normalises_fields(self) -> None:
+        """
+        Test whitespace is stripped, emails lowercased and ages typed.
+        """
+        self.assertEqual(
+            parse_row([" Ann ", " Ann@X.com ", "42"]), ("Ann", "ann@x.com", 42)
+        )
+
+    def test_rejects_invalid_rows(self) -> None:
+        """
+        Test that malformed rows raise ValueError.
+        """
+        for row in (["Ann", "ann@x.com"], ["", "ann@x.com", "1"],
+                    ["Ann", "ann", "1"], ["Ann", "ann@x.com", "old"],
+                    ["Ann", "ann@x.com", "1000"]):
+            with self.subTest(row=row):
+                with self.assertRaises(ValueError):
+                    parse_row(row)
+
+
+class TestStreamCSV(unittest.TestCase):
+    """
+    Test that the CSV is streamed as fixed-size chunks of valid rows.
+    """
+
+    def setUp(self) -> None:
+        """
+        Write a CSV with one invalid row.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "users.csv")
+        with open(self.path, "w", newline="") as f:
+            f.write("name,email,age\n")
+            for i in range(10):
+                f.write(f"User {i},user{i}@example.com,{i}\n")
+            f.write("Bad,not-an-email,5\n")
+
+    def tearDown(self) -> None:
+        """
+        Remove the CSV.
+        """
+        self.tmp.cleanup()
+
+    def test_chunks_are_bounded(self) -> None:
+        """
+        Test every chunk but the last holds exactly chunk_size rows.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            sizes = [len(chunk) for chunk in stream_csv_data(self.path, 4)]
+        self.assertEqual(sizes, [4, 4, 2])
+
+    def test_invalid_row_reported_by_line(self) -> None:
+        """
+        Test invalid rows are skipped and located by their line number.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            rows = [row for chunk in stream_csv_data(self.path) for row in chunk]
+        self.assertEqual(len(rows), 10)
+        self.assertIn("Skipping invalid row 12:", output.getvalue())
+
+
+class TestByteRanges(unittest.TestCase):
+    """
+    Test that byte ranges cover every CSV line exactly once.
+    """
+
+    def setUp(self) -> None:
+        """
+        Write a CSV with lines of varying length.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "users.csv")
+        self.lines = [
+            f"User {'x' * (i % 7)},user{i}@example.com,{i % 100}\n"
+            for i in range(97)
+        ]
+        with open(self.path, "w", newline="") as f:
+            f.write("name,email,age\n")
+            f.writelines(self.lines)
+
+    def tearDown(self) -> None:
+        """
+        Remove the CSV.
+        """
+        self.tmp.cleanup()
+
+    def test_ranges_are_contiguous(self) -> None:
+        """
+        Test the ranges start after the header and end at the file size.
+        """
+        ranges = split_byte_ranges(self.path, 4)
+        self.assertEqual(ranges[0][0], len("name,email,age\n"))
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.path))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+
+    def test_every_line_read_once(self) -> None:
+        """
+        Test that lines cut by a range boundary go to exactly one range.
+        """
+        for n in (1, 2, 3, 5, 16, 200):
+            with self.subTest(ranges=n):
+                read = [
+                    line
+                    for start, end in split_byte_ranges(self.path, n)
+                    for line in _read_byte_range(self.path, start, end)
+                ]
+                self.assertEqual(read, self.lines)
+
+    def test_ranges_match_serial_stream(self) -> None:
+        """
+        Test the sharded chunks hold the same rows as a serial read.
+        """
+        serial = [row for chunk in stream_csv_data(self.path, 10) for row in chunk]
+        sharded = [
+            row
+            for start, end in split_byte_ranges(self.path, 3)
+            for chunk in stream_csv_range(self.path, start, end, 10)
+            for row in chunk
+        ]
+        self.assertEqual(sharded, serial)
+
+    def test_invalid_row_reported_by_offset(self) -> None:
+        """
+        Test that a worker locates an invalid row by its byte offset.
+        """
+        with open(self.path, "a", newline="") as f:
+            offset = f.tell()
+            f.write("Bad,not-an-email,5\n")
+        start, end = split_byte_ranges(self.path, 2)[1]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for _ in stream_csv_range(self.path, start, end):
+                pass
+        self.assertIn(f"row at byte {offset}:", output.getvalue())
+
+    def test_count_distinct_across_shards(self) -> None:
+        """
+        Test values repeated within and across sorted arrays count once.
+        """
+        self.assertEqual(_count_distinct([[1, 1, 4], [2, 4, 9], []]), 4)
+        self.assertEqual(_count_distinct([]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()